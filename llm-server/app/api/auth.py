@@ -1,9 +1,15 @@
 """Authentication API endpoints."""
-from fastapi import APIRouter
+from fastapi import APIRouter, Header
 from loguru import logger
+from typing import Optional
 from app.models.schemas import LoginRequest, LoginResponse
 from app.services.auth_service import auth_service
 from app.services.api_key_manager import api_key_manager
+from app.services.cart_context import cart_context_manager
+from app.services.jwt_service import jwt_service
+from app.services.llm_service import llm_service
+from app.services.mcp_session_pool import mcp_session_pool
+from app.services.replica_router import replica_router
 
 router = APIRouter(prefix="/auth", tags=["authentication"])
 
@@ -43,7 +49,8 @@ async def login_endpoint(request: LoginRequest) -> LoginResponse:
         api_key_manager.store_user_credentials(
             user_id=user_id,
             mcp_api_key=mcp_api_key,
-            jwt_token=jwt_token
+            jwt_token=jwt_token,
+            mcp_server_url=auth_data["mcp_server_url"]
         )
 
         logger.info(f"User {request.username} logged in successfully")
@@ -68,17 +75,30 @@ async def login_endpoint(request: LoginRequest) -> LoginResponse:
 
 
 @router.post("/logout")
-async def logout_endpoint():
+async def logout_endpoint(authorization: Optional[str] = Header(None)):
     """
-    Logout endpoint (placeholder for future session management).
+    Logout endpoint that tears down the user's server-side session.
 
-    Currently, this is a placeholder. In a full implementation, you would:
-    1. Validate JWT token from Authorization header
-    2. Remove user credentials from APIKeyManager
-    3. Optionally revoke MCP API key
+    This endpoint:
+    1. Extracts the user ID from the JWT in the Authorization header
+    2. Revokes and removes the user's MCP credentials from APIKeyManager
+    3. Closes the user's persistent MCP session and drops their cart context
     """
-    # For now, just return success
-    # TODO: Implement proper session management with JWT validation
+    user_id = jwt_service.extract_user_id(authorization)
+    if not user_id:
+        # Nothing to tear down - the frontend clears its own state regardless
+        return {"success": True, "message": "Logged out successfully"}
+
+    mcp_api_key = api_key_manager.get_mcp_api_key(user_id)
+    jwt_token = api_key_manager.get_jwt_token(user_id)
+    if mcp_api_key and jwt_token:
+        await auth_service.revoke_api_key(mcp_api_key, jwt_token)
+
+    api_key_manager.remove_user(user_id)
+    cart_context_manager.remove_user(user_id)
+    await llm_service.end_user_session(user_id)
+
+    logger.info(f"User {user_id} logged out")
     return {"success": True, "message": "Logged out successfully"}
 
 
@@ -87,10 +107,14 @@ async def auth_status():
     """Get authentication service status."""
     active_users = api_key_manager.get_active_users()
     cleaned = api_key_manager.cleanup_expired()
+    cleaned_carts = cart_context_manager.cleanup_expired()
 
     return {
         "service": "authentication",
         "status": "healthy",
         "active_sessions": active_users,
-        "cleaned_expired": cleaned
+        "cleaned_expired": cleaned,
+        "cleaned_cart_contexts": cleaned_carts,
+        "mcp_sessions": mcp_session_pool.get_stats(),
+        "mcp_replicas": replica_router.get_stats()
     }
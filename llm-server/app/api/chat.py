@@ -1,18 +1,108 @@
 """Chat API endpoints."""
-from fastapi import APIRouter, Header
+import asyncio
+from fastapi import APIRouter, Header, Request
 from loguru import logger
-from typing import Optional
-from app.models.schemas import ChatRequest, ChatResponse
+from typing import Any, Optional, Tuple
+from app.config import settings
+from app.models.schemas import ChatJobResponse, ChatRequest, ChatResponse
 from app.services.llm_service import llm_service
 from app.services.api_key_manager import api_key_manager
+from app.services.circuit_breaker import CircuitOpenError
+from app.services.job_service import CANCELLED, FAILED, FINISHED_STATUSES, ChatJob, chat_job_manager
 from app.services.jwt_service import jwt_service
+from app.services.metrics import chat_metrics
 
 router = APIRouter(prefix="/api/v1", tags=["chat"])
 
 
+async def _run_until_disconnected(task: "asyncio.Task[Any]", http_request: Request) -> Optional[Any]:
+    """
+    Await a task, cancelling it if the HTTP client disconnects first.
+
+    Args:
+        task: Task running the agent
+        http_request: Incoming request used to detect disconnects
+
+    Returns:
+        The task result, or None if the client disconnected and the task was cancelled
+    """
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=settings.disconnect_poll_seconds)
+            if done:
+                return task.result()
+
+            if await http_request.is_disconnected():
+                logger.warning("Client disconnected - cancelling agent run")
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+                return None
+    finally:
+        # Never leave the agent running if this handler itself is cancelled
+        if not task.done():
+            task.cancel()
+
+
+async def _prepare_llm_service(authorization: Optional[str]) -> Tuple[Optional[str], Optional[ChatResponse]]:
+    """
+    Resolve the user from the Authorization header and initialize the LLM service.
+
+    Args:
+        authorization: Authorization header value (optional)
+
+    Returns:
+        Tuple[user_id, error_response] - error_response is set when chatting is not possible
+    """
+    # Extract user ID from JWT token if provided
+    user_id = None
+    if authorization:
+        user_id = jwt_service.extract_user_id(authorization)
+        if user_id:
+            logger.info(f"Authenticated request for user ID: {user_id}")
+        else:
+            logger.warning("Invalid JWT token provided - falling back to unauthenticated mode")
+
+    # Initialize LLM service with user-specific or default credentials
+    if not llm_service.is_initialized or user_id:
+        # Reinitialize for user-specific API key or first-time init
+        try:
+            await llm_service.initialize(user_id=user_id)
+        except CircuitOpenError as e:
+            logger.warning(f"Not initializing while the store service is down: {e}")
+            return user_id, ChatResponse(
+                message="❌ The store service is temporarily unavailable. Please try again in a moment.",
+                is_error=True
+            )
+        except ValueError as e:
+            logger.warning(f"Failed to initialize with user credentials: {e}")
+
+            # If user-specific initialization failed, check if we have a valid user session
+            if user_id and not api_key_manager.has_valid_credentials(user_id):
+                return user_id, ChatResponse(
+                    message="❌ Your session has expired or is invalid. Please log in again to continue chatting.",
+                    is_error=True
+                )
+
+            # Fallback to system initialization (environment variables)
+            try:
+                await llm_service.initialize(user_id=None)
+            except ValueError as fallback_error:
+                logger.error(f"System initialization also failed: {fallback_error}")
+                return user_id, ChatResponse(
+                    message="❌ AI service is temporarily unavailable. Please try again later.",
+                    is_error=True
+                )
+
+    return user_id, None
+
+
 @router.post("/chat", response_model=ChatResponse)
 async def chat_endpoint(
     request: ChatRequest,
+    http_request: Request,
     authorization: Optional[str] = Header(None)
 ) -> ChatResponse:
     """
@@ -27,42 +117,18 @@ async def chat_endpoint(
     try:
         logger.info(f"Received chat request: {request.message}")
 
-        # Extract user ID from JWT token if provided
-        user_id = None
-        if authorization:
-            user_id = jwt_service.extract_user_id(authorization)
-            if user_id:
-                logger.info(f"Authenticated request for user ID: {user_id}")
-            else:
-                logger.warning("Invalid JWT token provided - falling back to unauthenticated mode")
-
-        # Initialize LLM service with user-specific or default credentials
-        if not llm_service.is_initialized or user_id:
-            # Reinitialize for user-specific API key or first-time init
-            try:
-                await llm_service.initialize(user_id=user_id)
-            except ValueError as e:
-                logger.warning(f"Failed to initialize with user credentials: {e}")
-
-                # If user-specific initialization failed, check if we have a valid user session
-                if user_id and not api_key_manager.has_valid_credentials(user_id):
-                    return ChatResponse(
-                        message="❌ Your session has expired or is invalid. Please log in again to continue chatting.",
-                        is_error=True
-                    )
-
-                # Fallback to system initialization (environment variables)
-                try:
-                    await llm_service.initialize(user_id=None)
-                except ValueError as fallback_error:
-                    logger.error(f"System initialization also failed: {fallback_error}")
-                    return ChatResponse(
-                        message="❌ AI service is temporarily unavailable. Please try again later.",
-                        is_error=True
-                    )
+        user_id, error_response = await _prepare_llm_service(authorization)
+        if error_response:
+            return error_response
 
-        # Process message through LLM service
-        response_message = await llm_service.chat(request.message)
+        # Process message through LLM service, abandoning it if the client goes away
+        chat_task = asyncio.create_task(llm_service.chat(request.message, user_id=user_id))
+        response_message = await _run_until_disconnected(chat_task, http_request)
+        if response_message is None:
+            return ChatResponse(
+                message="Request cancelled because the client disconnected.",
+                is_error=True
+            )
 
         return ChatResponse(
             message=response_message,
@@ -78,3 +144,98 @@ async def chat_endpoint(
             message=f"❌ I'm sorry, I encountered an error: {str(e)}",
             is_error=True
         )
+
+
+def _job_response(job: ChatJob) -> ChatJobResponse:
+    """Build the API response for a job."""
+    if job.status == FAILED:
+        message = f"❌ I'm sorry, I encountered an error: {job.error}"
+    elif job.status == CANCELLED:
+        message = "Request cancelled."
+    else:
+        message = job.result
+
+    return ChatJobResponse(
+        job_id=job.job_id,
+        status=job.status,
+        message=message,
+        is_error=job.status in {FAILED, CANCELLED}
+    )
+
+
+@router.post("/chat/jobs", response_model=ChatJobResponse)
+async def create_chat_job(
+    request: ChatRequest,
+    authorization: Optional[str] = Header(None)
+) -> ChatJobResponse:
+    """
+    Queue a chat message for background processing and return its job ID immediately.
+
+    Poll GET /chat/jobs/{job_id} (optionally with ?wait=<seconds> to long-poll)
+    for the result, which is kept for CHAT_JOB_TTL_SECONDS after completion.
+    """
+    try:
+        logger.info(f"Received chat job request: {request.message}")
+
+        user_id, error_response = await _prepare_llm_service(authorization)
+        if error_response:
+            return ChatJobResponse(status="rejected", message=error_response.message, is_error=True)
+
+        job = chat_job_manager.submit(request.message, user_id=user_id)
+        if not job:
+            return ChatJobResponse(
+                status="rejected",
+                message="❌ The assistant is very busy right now. Please try again in a moment.",
+                is_error=True
+            )
+
+        return _job_response(job)
+
+    except Exception as e:
+        logger.error(f"Error in chat job endpoint: {e}")
+        return ChatJobResponse(
+            status="rejected",
+            message=f"❌ I'm sorry, I encountered an error: {str(e)}",
+            is_error=True
+        )
+
+
+@router.get("/chat/jobs/{job_id}", response_model=ChatJobResponse)
+async def get_chat_job(
+    job_id: str,
+    wait: float = 0,
+    authorization: Optional[str] = Header(None)
+) -> ChatJobResponse:
+    """
+    Get the status and result of a chat job.
+
+    Args:
+        job_id: Job identifier returned by POST /chat/jobs
+        wait: Seconds to wait for the job to finish (long-poll, capped by CHAT_JOB_MAX_WAIT_SECONDS)
+    """
+    user_id = jwt_service.extract_user_id(authorization)
+    job = chat_job_manager.get_job(job_id, user_id=user_id)
+    if not job:
+        return ChatJobResponse(job_id=job_id, status="not_found", message="Job not found or expired", is_error=True)
+
+    if job.status not in FINISHED_STATUSES:
+        await chat_job_manager.wait(job, timeout=min(max(wait, 0), settings.chat_job_max_wait_seconds))
+    return _job_response(job)
+
+
+@router.delete("/chat/jobs/{job_id}", response_model=ChatJobResponse)
+async def cancel_chat_job(job_id: str, authorization: Optional[str] = Header(None)) -> ChatJobResponse:
+    """Cancel a queued or running chat job."""
+    user_id = jwt_service.extract_user_id(authorization)
+    job = chat_job_manager.get_job(job_id, user_id=user_id)
+    if not job:
+        return ChatJobResponse(job_id=job_id, status="not_found", message="Job not found or expired", is_error=True)
+
+    chat_job_manager.cancel(job)
+    return _job_response(job)
+
+
+@router.get("/chat/metrics")
+async def chat_metrics_endpoint():
+    """Get chat request, LLM call and tool call counters by outcome, plus job queue stats."""
+    return {**chat_metrics.get_stats(), "jobs": chat_job_manager.get_stats()}
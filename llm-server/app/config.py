@@ -1,6 +1,7 @@
 """Configuration management using Pydantic Settings."""
+from pydantic import field_validator
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import Dict, List, Optional
 
 
 class Settings(BaseSettings):
@@ -13,6 +14,62 @@ class Settings(BaseSettings):
     mcp_server_url: str = "https://29f37bbbb62f.ngrok-free.app"
     mcp_api_key: Optional[str] = None  # Optional - will be fetched dynamically per user
 
+    # MCP Replica Routing Configuration
+    mcp_server_urls: List[str] = []  # Replica base URLs, e.g. ["http://mcp-1:3000", "http://mcp-2:3000"] (defaults to mcp_server_url)
+    mcp_replica_policy: str = "least_outstanding"  # "least_outstanding" or "lowest_latency"
+    mcp_replica_eject_failures: int = 3  # Consecutive failures before a replica is ejected
+    mcp_replica_eject_seconds: float = 30.0  # How long an ejected replica receives no new sessions
+    mcp_system_server_url: Optional[str] = None  # Replica that accepts MCP_API_KEY (defaults to the first replica)
+
+    # MCP Session Pool Configuration
+    mcp_session_idle_timeout_seconds: int = 900  # Close a user's MCP session after this much inactivity
+    mcp_session_health_check_seconds: int = 60  # Interval between session health checks / expiry checks
+
+    # Session Cleanup Configuration
+    session_cleanup_seconds: int = 300  # Interval for removing expired credentials and cart contexts
+
+    # Catalog Mirror Configuration
+    catalog_refresh_seconds: int = 600  # How often the local product catalog is reloaded
+
+    # Request Handling Configuration
+    disconnect_poll_seconds: float = 0.5  # How often a running chat checks for client disconnects
+
+    # Circuit Breaker Configuration (applied to MCP auth, MCP tools and OpenAI separately)
+    circuit_failure_rate: float = 0.5  # Failure rate within the window that opens a breaker
+    circuit_min_calls: int = 5  # Calls needed in the window before the rate is evaluated
+    circuit_window_seconds: float = 60.0
+    circuit_open_seconds: float = 30.0  # Fail-fast period before a half-open probe
+    openai_timeout_seconds: float = 30.0  # Per-request timeout for OpenAI calls
+
+    # Chat Job Configuration
+    chat_job_workers: int = 4  # Agent runs processed concurrently in job mode
+    chat_job_queue_size: int = 100  # Jobs waiting beyond this are rejected
+    chat_job_ttl_seconds: int = 600  # How long finished job results are kept
+    chat_job_max_wait_seconds: float = 30.0  # Upper bound for long-poll waits
+
+    # Agent Budget Configuration
+    agent_max_steps: int = 8  # Max ReAct iterations (LLM call + tool round) per request
+    agent_max_tool_calls: int = 10  # Max tool calls per request
+    agent_max_seconds: float = 60.0  # Wall time per request before a best-effort answer is forced
+    agent_answer_grace_seconds: float = 10.0  # Extra time for the best-effort answer beyond agent_max_seconds
+    agent_max_repeated_calls: int = 2  # Identical/near-identical read-only calls tolerated before stopping
+    agent_repeat_similarity: float = 0.8  # Argument token similarity treated as a repeated call
+
+    # Speculative Prefetch Configuration
+    speculative_prefetch_enabled: bool = False  # Start predicted read-only tool calls alongside the first LLM call
+
+    # Tool Output Compaction Configuration
+    tool_compaction_enabled: bool = True
+    tool_compaction_max_items: int = 8  # Max products/cart lines passed to the LLM per tool result
+    tool_compaction_description_chars: int = 80  # 0 drops descriptions entirely
+    tool_compaction_max_chars: int = 2000  # Hard cap on any tool result sent to the LLM
+    tool_compaction_fields: Dict[str, List[str]] = {}  # Per-tool field projection, e.g. {"search_products": ["title", "price"]}
+
+    # Record/Replay Configuration
+    record_mode: str = "off"  # "off" or "record" (write cassettes); replay only runs through replay.py
+    cassette_dir: str = "cassettes"
+    replay_time_scale: float = 1.0  # Multiplier for recorded latencies during replay (0 = no delays)
+
     # LLM Server Configuration
     host: str = "0.0.0.0"
     port: int = 8001
@@ -21,6 +78,25 @@ class Settings(BaseSettings):
     # CORS Configuration
     frontend_url: str = "http://localhost:5173"
 
+    @field_validator("record_mode")
+    @classmethod
+    def check_record_mode(cls, value: str) -> str:
+        """Reject replay for the server - it needs a cassette and would answer real users from it."""
+        if value not in ("off", "record"):
+            raise ValueError("RECORD_MODE must be 'off' or 'record' (use replay.py to replay a cassette)")
+        return value
+
+    @property
+    def mcp_replica_urls(self) -> List[str]:
+        """MCP replica base URLs without trailing slashes."""
+        urls = self.mcp_server_urls or [self.mcp_server_url]
+        return [url.rstrip('/') for url in urls]
+
+    @property
+    def mcp_system_replica_url(self) -> str:
+        """Replica the system session (MCP_API_KEY) is pinned to, without trailing slash."""
+        return (self.mcp_system_server_url or self.mcp_replica_urls[0]).rstrip('/')
+
     class Config:
         env_file = ".env"
         env_file_encoding = "utf-8"
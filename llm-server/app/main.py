@@ -3,15 +3,32 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 from loguru import logger
+import asyncio
 import sys
 
 from app.config import settings
 from app.api.chat import router as chat_router
 from app.api.auth import router as auth_router
+from app.services.api_key_manager import api_key_manager
+from app.services.cart_context import cart_context_manager
+from app.services.circuit_breaker import CLOSED, get_circuit_stats
+from app.services.job_service import chat_job_manager
 from app.services.llm_service import llm_service
 from app.models.schemas import HealthResponse
 
 
+async def cleanup_loop():
+    """Periodically remove expired user state (it otherwise only expires when the same user returns)."""
+    while True:
+        await asyncio.sleep(settings.session_cleanup_seconds)
+        try:
+            await llm_service.cleanup_expired_sessions()
+            api_key_manager.cleanup_expired()
+            cart_context_manager.cleanup_expired()
+        except Exception as e:
+            logger.error(f"Session cleanup failed: {e}")
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan events."""
@@ -29,10 +46,14 @@ async def lifespan(app: FastAPI):
     # Initialize LLM service (lazy initialization)
     logger.info("LLM Service will be initialized on first request")
 
+    cleanup_task = asyncio.create_task(cleanup_loop())
+
     yield
 
     # Shutdown
     logger.info("Shutting down LLM Server...")
+    cleanup_task.cancel()
+    await chat_job_manager.close()
     await llm_service.close()
 
 
@@ -60,10 +81,13 @@ app.include_router(auth_router)
 
 @app.get("/health", response_model=HealthResponse)
 async def health_check():
-    """Health check endpoint."""
+    """Health check endpoint ("degraded" while any upstream circuit is not closed)."""
+    circuits = get_circuit_stats()
+    degraded = any(circuit["state"] != CLOSED for circuit in circuits.values())
     return HealthResponse(
-        status="healthy",
-        version="1.0.0"
+        status="degraded" if degraded else "healthy",
+        version="1.0.0",
+        circuits=circuits
     )
 
 
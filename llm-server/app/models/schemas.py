@@ -1,6 +1,6 @@
 """Request and Response schemas for the LLM Server API."""
 from pydantic import BaseModel
-from typing import Optional
+from typing import Any, Dict, Optional
 
 
 # Chat Schemas
@@ -15,6 +15,14 @@ class ChatResponse(BaseModel):
     is_error: bool = False
 
 
+class ChatJobResponse(BaseModel):
+    """Response schema for asynchronous chat jobs."""
+    job_id: Optional[str] = None
+    status: str  # queued, running, completed, failed, cancelled, rejected, not_found
+    message: Optional[str] = None
+    is_error: bool = False
+
+
 # Authentication Schemas
 class LoginRequest(BaseModel):
     """Request schema for user login."""
@@ -44,4 +52,5 @@ class LoginResponse(BaseModel):
 class HealthResponse(BaseModel):
     """Health check response schema."""
     status: str
-    version: str
\ No newline at end of file
+    version: str
+    circuits: Optional[Dict[str, Any]] = None
\ No newline at end of file
@@ -0,0 +1,109 @@
+"""Per-request agent budget: tool call limits and repeated-call (loop) detection."""
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import FrozenSet, List, Optional, Tuple
+from langchain_core.messages import AIMessage, BaseMessage
+from loguru import logger
+from app.services.catalog_service import tokenize
+from app.services.tool_pipeline import (
+    READ_ONLY_TOOLS,
+    CallNext,
+    ToolCall,
+    ToolInterceptor,
+    ToolResult,
+    result_text,
+    text_result,
+)
+
+
+STOP_INSTRUCTION = "Do not call any more tools - answer the user now with the information you already have."
+
+
+def argument_tokens(call: ToolCall) -> FrozenSet[str]:
+    """Normalised token set of a call's arguments (lowercase, naive singular)."""
+    tokens = set()
+    for value in call.arguments.values():
+        for token in tokenize(str(value)):
+            tokens.add(token[:-1] if len(token) > 3 and token.endswith("s") else token)
+    return frozenset(tokens)
+
+
+def similarity(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    """Jaccard similarity of two token sets."""
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+@dataclass
+class AgentBudget:
+    """Limits and running counters for one agent run."""
+    max_tool_calls: int = 10
+    max_repeated_calls: int = 2
+    similarity_threshold: float = 0.8
+    tool_calls: int = 0
+    repeated_calls: int = 0
+    exhausted_reason: Optional[str] = None
+    _history: List[Tuple[str, FrozenSet[str], ToolResult]] = field(default_factory=list)
+
+    @property
+    def exhausted(self) -> bool:
+        """True once any limit has been hit."""
+        return self.exhausted_reason is not None
+
+    def find_repeat(self, call: ToolCall) -> Optional[ToolResult]:
+        """Return the earlier result of an identical or near-identical read-only call."""
+        if call.name not in READ_ONLY_TOOLS:
+            return None
+
+        tokens = argument_tokens(call)
+        for name, previous_tokens, result in self._history:
+            if name == call.name and similarity(tokens, previous_tokens) >= self.similarity_threshold:
+                return result
+        return None
+
+    def remember(self, call: ToolCall, result: ToolResult) -> None:
+        """Keep a call's result for repeat detection (state changes invalidate earlier reads)."""
+        if call.name in READ_ONLY_TOOLS:
+            self._history.append((call.name, argument_tokens(call), result))
+        else:
+            self._history.clear()
+
+
+# Budget for the chat request currently being processed
+current_budget: ContextVar[Optional[AgentBudget]] = ContextVar("current_budget", default=None)
+
+
+class BudgetInterceptor(ToolInterceptor):
+    """Enforces the tool call budget and short-circuits repeated calls."""
+
+    async def intercept(self, call: ToolCall, call_next: CallNext) -> ToolResult:
+        """Block calls past the budget and answer repeats from earlier results."""
+        budget = current_budget.get()
+        if budget is None:
+            return await call_next(call)
+
+        if budget.exhausted or budget.tool_calls >= budget.max_tool_calls:
+            budget.exhausted_reason = budget.exhausted_reason or f"tool call limit of {budget.max_tool_calls}"
+            return text_result(f"Tool budget exhausted. {STOP_INSTRUCTION}")
+
+        previous = budget.find_repeat(call)
+        if previous is not None:
+            budget.repeated_calls += 1
+            logger.warning(f"Repeated {call.name} call detected ({budget.repeated_calls}): {call.arguments}")
+            if budget.repeated_calls >= budget.max_repeated_calls:
+                budget.exhausted_reason = f"{budget.repeated_calls} repeated tool calls"
+            return text_result(f"{result_text(previous)}\n\n(Same result as an earlier call. {STOP_INSTRUCTION})")
+
+        budget.tool_calls += 1
+        result = await call_next(call)
+        budget.remember(call, result)
+        return result
+
+
+def strip_pending_tool_calls(messages: List[BaseMessage]) -> List[BaseMessage]:
+    """Drop a trailing AI message whose tool calls were never answered."""
+    history = list(messages)
+    while history and isinstance(history[-1], AIMessage) and history[-1].tool_calls:
+        history.pop()
+    return history
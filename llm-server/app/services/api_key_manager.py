@@ -9,11 +9,18 @@ class APIKeyManager:
     """Thread-safe manager for storing and retrieving user MCP API keys."""
 
     def __init__(self):
-        self._api_keys: Dict[str, Dict] = {}  # user_id -> {api_key, jwt_token, expires_at}
+        self._api_keys: Dict[str, Dict] = {}  # user_id -> {api_key, jwt_token, mcp_server_url, expires_at}
         self._lock = threading.RLock()
         logger.info("APIKeyManager initialized")
 
-    def store_user_credentials(self, user_id: str, mcp_api_key: str, jwt_token: str, expires_hours: int = 24) -> None:
+    def store_user_credentials(
+        self,
+        user_id: str,
+        mcp_api_key: str,
+        jwt_token: str,
+        expires_hours: int = 24,
+        mcp_server_url: Optional[str] = None
+    ) -> None:
         """
         Store MCP API key and JWT token for a user.
 
@@ -22,12 +29,14 @@ class APIKeyManager:
             mcp_api_key: MCP API key from Node.js server
             jwt_token: JWT token for MCP server authentication
             expires_hours: Hours until credentials expire (default 24)
+            mcp_server_url: MCP replica that issued the credentials (they are only valid there)
         """
         with self._lock:
             expires_at = datetime.now() + timedelta(hours=expires_hours)
             self._api_keys[user_id] = {
                 "mcp_api_key": mcp_api_key,
                 "jwt_token": jwt_token,
+                "mcp_server_url": mcp_server_url,
                 "expires_at": expires_at,
                 "created_at": datetime.now()
             }
@@ -78,6 +87,21 @@ class APIKeyManager:
 
             return user_data["jwt_token"]
 
+    def get_mcp_server_url(self, user_id: str) -> Optional[str]:
+        """
+        Get the MCP replica a user is pinned to.
+
+        Args:
+            user_id: User identifier
+
+        Returns:
+            Replica base URL if the user has valid credentials from a known replica, None otherwise
+        """
+        with self._lock:
+            if not self.has_valid_credentials(user_id):
+                return None
+            return self._api_keys[user_id].get("mcp_server_url")
+
     def remove_user(self, user_id: str) -> bool:
         """
         Remove user credentials (for logout).
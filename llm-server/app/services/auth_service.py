@@ -4,86 +4,35 @@ from loguru import logger
 from typing import Dict, Optional, Tuple
 from app.models.schemas import LoginRequest, UserData
 from app.config import settings
+from app.services.circuit_breaker import MCP_AUTH, CircuitOpenError, circuit_breakers
+from app.services.replica_router import replica_router
 
 
 class AuthService:
     """Service for handling authentication with MCP server and API key management."""
 
     def __init__(self):
-        self.base_url = settings.mcp_server_url
-        # Remove any trailing slashes for consistent URL construction
-        if self.base_url.endswith('/'):
-            self.base_url = self.base_url.rstrip('/')
-
-        logger.info(f"AuthService initialized with MCP server: {self.base_url}")
+        logger.info(f"AuthService initialized with MCP servers: {', '.join(settings.mcp_replica_urls)}")
 
     async def authenticate_user(self, credentials: LoginRequest) -> Tuple[bool, Optional[Dict], Optional[str]]:
         """
         Authenticate user with MCP server and fetch API key.
 
+        The login goes to the least loaded healthy replica; the returned
+        mcp_server_url pins the user there, since the API key only exists on it.
+
         Returns:
             Tuple[success, user_data, error_message]
         """
         try:
             logger.info(f"Authenticating user: {credentials.username}")
 
-            # Step 1: Login to MCP server
-            async with httpx.AsyncClient() as client:
-                login_response = await client.post(
-                    f"{self.base_url}/login",
-                    json={
-                        "username": credentials.username,
-                        "password": credentials.password
-                    },
-                    headers={"Content-Type": "application/json"},
-                    timeout=10.0
-                )
-
-                if login_response.status_code != 200:
-                    logger.error(f"Login failed with status {login_response.status_code}")
-                    return False, None, "Authentication failed"
-
-                login_data = login_response.json()
-                if not login_data.get("success", False):
-                    error_msg = login_data.get("error", "Login failed")
-                    logger.error(f"Login rejected: {error_msg}")
-                    return False, None, error_msg
-
-                jwt_token = login_data["data"]["token"]
-                user_data = login_data["data"]["user"]
-                logger.info(f"User {credentials.username} authenticated successfully")
-
-                # Step 2: Generate MCP API key for this session
-                api_key_response = await client.post(
-                    f"{self.base_url}/api-keys",
-                    json={"name": f"LLM Server - {credentials.username}"},
-                    headers={
-                        "Content-Type": "application/json",
-                        "Authorization": f"Bearer {jwt_token}"
-                    },
-                    timeout=10.0
-                )
-
-                if api_key_response.status_code not in [200, 201]:
-                    logger.error(f"API key generation failed with status {api_key_response.status_code}")
-                    return False, None, "Failed to generate API key"
-
-                api_key_data = api_key_response.json()
-                if not api_key_data.get("success", False):
-                    error_msg = api_key_data.get("error", "API key generation failed")
-                    logger.error(f"API key generation rejected: {error_msg}")
-                    return False, None, error_msg
-
-                mcp_api_key = api_key_data["data"]["key"]
-                logger.info(f"Generated MCP API key for user {credentials.username}")
-
-                # Return success with combined data
-                return True, {
-                    "user": user_data,
-                    "token": jwt_token,
-                    "mcp_api_key": mcp_api_key
-                }, None
+            # Fail fast while the MCP server is known to be down instead of waiting for timeouts
+            return await circuit_breakers[MCP_AUTH].call(self._authenticate, credentials, replica_router.choose())
 
+        except CircuitOpenError as e:
+            logger.warning(f"Skipping authentication: {e}")
+            return False, None, "Authentication server is temporarily unavailable. Please try again shortly."
         except httpx.RequestError as e:
             logger.error(f"Network error during authentication: {e}")
             return False, None, "Unable to connect to authentication server"
@@ -94,6 +43,77 @@ class AuthService:
             logger.error(f"Unexpected error during authentication: {e}")
             return False, None, "Authentication failed due to server error"
 
+    async def _authenticate(self, credentials: LoginRequest, base_url: str) -> Tuple[bool, Optional[Dict], Optional[str]]:
+        """
+        Login to an MCP server replica and generate an API key.
+
+        Network errors and 5xx responses are raised (so the circuit breaker and replica health count them);
+        rejected credentials are returned as a failed result.
+        """
+        # Step 1: Login to MCP server
+        async with httpx.AsyncClient() as client, replica_router.track(base_url):
+            login_response = await client.post(
+                f"{base_url}/login",
+                json={
+                    "username": credentials.username,
+                    "password": credentials.password
+                },
+                headers={"Content-Type": "application/json"},
+                timeout=10.0
+            )
+
+            if login_response.status_code >= 500:
+                login_response.raise_for_status()
+
+            if login_response.status_code != 200:
+                logger.error(f"Login failed with status {login_response.status_code}")
+                return False, None, "Authentication failed"
+
+            login_data = login_response.json()
+            if not login_data.get("success", False):
+                error_msg = login_data.get("error", "Login failed")
+                logger.error(f"Login rejected: {error_msg}")
+                return False, None, error_msg
+
+            jwt_token = login_data["data"]["token"]
+            user_data = login_data["data"]["user"]
+            logger.info(f"User {credentials.username} authenticated successfully")
+
+            # Step 2: Generate MCP API key for this session
+            api_key_response = await client.post(
+                f"{base_url}/api-keys",
+                json={"name": f"LLM Server - {credentials.username}"},
+                headers={
+                    "Content-Type": "application/json",
+                    "Authorization": f"Bearer {jwt_token}"
+                },
+                timeout=10.0
+            )
+
+            if api_key_response.status_code >= 500:
+                api_key_response.raise_for_status()
+
+            if api_key_response.status_code not in [200, 201]:
+                logger.error(f"API key generation failed with status {api_key_response.status_code}")
+                return False, None, "Failed to generate API key"
+
+            api_key_data = api_key_response.json()
+            if not api_key_data.get("success", False):
+                error_msg = api_key_data.get("error", "API key generation failed")
+                logger.error(f"API key generation rejected: {error_msg}")
+                return False, None, error_msg
+
+            mcp_api_key = api_key_data["data"]["key"]
+            logger.info(f"Generated MCP API key for user {credentials.username}")
+
+            # Return success with combined data
+            return True, {
+                "user": user_data,
+                "token": jwt_token,
+                "mcp_api_key": mcp_api_key,
+                "mcp_server_url": base_url
+            }, None
+
     async def revoke_api_key(self, api_key: str, jwt_token: str) -> bool:
         """
         Revoke an MCP API key when user logs out.
@@ -0,0 +1,293 @@
+"""Cart context manager for tracking each user's active cart between chat messages."""
+import re
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+from loguru import logger
+from app.services.tool_pipeline import (
+    CallNext,
+    ToolCall,
+    ToolInterceptor,
+    ToolResult,
+    result_text,
+    text_result,
+)
+
+
+CART_TOOLS = {"add_to_cart", "get_cart", "remove_from_cart"}
+
+# Patterns matching the text returned by the Node.js MCP server ToolHandlers
+_CART_ID_PATTERN = re.compile(r"Cart ID: (\d+)")
+_ADDED_PATTERN = re.compile(r"Added (\d+)x (.+?) \(\$([\d.]+) each\)")
+_REMOVED_PATTERN = re.compile(r"Removed (?:\d+|all) (.+?) from your cart")
+_REMAINING_PATTERN = re.compile(r"Remaining in cart: (\d+)x ")
+_TOTAL_ITEMS_PATTERN = re.compile(r"Total items in cart: (\d+)")
+_CART_HEADER_PATTERN = re.compile(r"Your Cart \(ID: (\d+)\)")
+_CART_ITEM_PATTERN = re.compile(r"^(\d+)x (.+)\n\s+Price: \$([\d.]+) each", re.MULTILINE)
+_EMPTY_CART_PATTERN = re.compile(r"Cart (\d+) is empty")
+
+
+@dataclass
+class CartItem:
+    """Single product line in the local cart mirror."""
+    title: str
+    price: float
+    quantity: int
+
+
+@dataclass
+class CartContext:
+    """Active cart state for one user."""
+    cart_id: Optional[int] = None
+    items: Dict[str, CartItem] = field(default_factory=dict)
+    is_complete: bool = False  # True when the mirror is known to match the upstream cart
+    updated_at: datetime = field(default_factory=datetime.now)
+
+
+class CartContextManager:
+    """Thread-safe manager for per-user cart ids and local cart content mirrors."""
+
+    def __init__(self, expires_hours: int = 24):
+        self._contexts: Dict[str, CartContext] = {}  # user_id -> CartContext
+        self._expires_after = timedelta(hours=expires_hours)
+        self._lock = threading.RLock()
+        logger.info("CartContextManager initialized")
+
+    def get_cart_id(self, user_id: str) -> Optional[int]:
+        """
+        Get the active cart ID for a user.
+
+        Args:
+            user_id: User identifier
+
+        Returns:
+            Active cart ID if known and not expired, None otherwise
+        """
+        with self._lock:
+            context = self._get_context(user_id)
+            return context.cart_id if context else None
+
+    def render_cart(self, user_id: str, cart_id: int) -> Optional[str]:
+        """
+        Render the local cart mirror in the same format as the get_cart tool.
+
+        Args:
+            user_id: User identifier
+            cart_id: Cart ID being requested
+
+        Returns:
+            Cart text if the mirror is complete for that cart, None otherwise
+        """
+        with self._lock:
+            context = self._get_context(user_id)
+            if not context or not context.is_complete or context.cart_id != cart_id:
+                return None
+
+            if not context.items:
+                return f"🛒 Cart {cart_id} is empty"
+
+            lines = [
+                f"{item.quantity}x {item.title}\n"
+                f"   Price: ${item.price:g} each\n"
+                f"   Subtotal: ${item.price * item.quantity:.2f}"
+                for item in context.items.values()
+            ]
+            total_items = sum(item.quantity for item in context.items.values())
+            total_price = sum(item.price * item.quantity for item in context.items.values())
+
+            return (
+                f"🛒 Your Cart (ID: {cart_id})\n\n" + "\n\n".join(lines) +
+                f"\n\n📊 Cart Summary:\n   Total Items: {total_items}\n   Total Price: ${total_price:.2f}"
+            )
+
+    def record_tool_result(self, user_id: str, tool_name: str, arguments: Dict[str, Any], text: str) -> None:
+        """
+        Update the cart context from a successful cart tool result.
+
+        Args:
+            user_id: User identifier
+            tool_name: Cart tool that was called
+            arguments: Arguments sent to the MCP server
+            text: Text returned by the MCP server
+        """
+        with self._lock:
+            context = self._get_context(user_id) or CartContext()
+
+            if tool_name == "add_to_cart":
+                self._apply_add(context, arguments, text)
+            elif tool_name == "remove_from_cart":
+                self._apply_remove(context, text)
+            elif tool_name == "get_cart":
+                self._apply_snapshot(context, arguments, text)
+
+            context.updated_at = datetime.now()
+            self._contexts[user_id] = context
+
+    def remove_user(self, user_id: str) -> bool:
+        """
+        Remove cart context for a user (for logout).
+
+        Args:
+            user_id: User identifier
+
+        Returns:
+            True if context was removed, False if not found
+        """
+        with self._lock:
+            if user_id in self._contexts:
+                del self._contexts[user_id]
+                logger.info(f"Removed cart context for user {user_id}")
+                return True
+            return False
+
+    def cleanup_expired(self) -> int:
+        """
+        Remove all expired cart contexts.
+
+        Returns:
+            Number of expired entries removed
+        """
+        with self._lock:
+            cutoff = datetime.now() - self._expires_after
+            expired_users = [
+                user_id for user_id, context in self._contexts.items()
+                if context.updated_at < cutoff
+            ]
+
+            for user_id in expired_users:
+                del self._contexts[user_id]
+
+            if expired_users:
+                logger.info(f"Cleaned up {len(expired_users)} expired cart contexts")
+
+            return len(expired_users)
+
+    def _get_context(self, user_id: str) -> Optional[CartContext]:
+        """Internal method returning a non-expired context (caller holds the lock)."""
+        context = self._contexts.get(user_id)
+        if context and datetime.now() - context.updated_at > self._expires_after:
+            del self._contexts[user_id]
+            logger.info(f"Cart context expired for user {user_id}")
+            return None
+        return context
+
+    def _apply_add(self, context: CartContext, arguments: Dict[str, Any], text: str) -> None:
+        """Apply an add_to_cart result to the mirror."""
+        cart_match = _CART_ID_PATTERN.search(text)
+        if not cart_match:
+            return
+
+        cart_id = int(cart_match.group(1))
+        if "cart_id" not in arguments or context.cart_id != cart_id:
+            # A new cart (or one we have never seen) - start a fresh mirror
+            context.items = {}
+            context.is_complete = "cart_id" not in arguments
+            context.cart_id = cart_id
+            logger.info(f"Active cart set to {cart_id}")
+
+        added_match = _ADDED_PATTERN.search(text)
+        if not added_match:
+            context.is_complete = False
+            return
+
+        quantity, title, price = int(added_match.group(1)), added_match.group(2), float(added_match.group(3))
+        item = context.items.get(title)
+        if item:
+            item.quantity += quantity
+        else:
+            context.items[title] = CartItem(title=title, price=price, quantity=quantity)
+
+        self._check_total(context, text)
+
+    def _apply_remove(self, context: CartContext, text: str) -> None:
+        """Apply a remove_from_cart result to the mirror."""
+        removed_match = _REMOVED_PATTERN.search(text)
+        if not removed_match:
+            context.is_complete = False
+            return
+
+        title = removed_match.group(1)
+        remaining_match = _REMAINING_PATTERN.search(text)
+        if remaining_match and title in context.items:
+            context.items[title].quantity = int(remaining_match.group(1))
+        elif remaining_match:
+            context.is_complete = False
+        else:
+            context.items.pop(title, None)
+
+        self._check_total(context, text)
+
+    def _apply_snapshot(self, context: CartContext, arguments: Dict[str, Any], text: str) -> None:
+        """Replace the mirror with a full get_cart result."""
+        header_match = _CART_HEADER_PATTERN.search(text) or _EMPTY_CART_PATTERN.search(text)
+        if not header_match:
+            return
+
+        context.cart_id = int(header_match.group(1))
+        context.items = {
+            title: CartItem(title=title, price=float(price), quantity=int(quantity))
+            for quantity, title, price in _CART_ITEM_PATTERN.findall(text)
+        }
+        # Unknown products are listed without a price line and cannot be mirrored
+        context.is_complete = "Unknown Product" not in text
+
+    def _check_total(self, context: CartContext, text: str) -> None:
+        """Mark the mirror incomplete if it disagrees with the server's item total."""
+        total_match = _TOTAL_ITEMS_PATTERN.search(text)
+        if not total_match:
+            return
+
+        mirrored = sum(item.quantity for item in context.items.values())
+        if mirrored != int(total_match.group(1)):
+            context.is_complete = False
+
+
+class CartContextInterceptor(ToolInterceptor):
+    """Injects the active cart ID into cart tools and serves cart reads from the local mirror."""
+
+    def __init__(self, manager: CartContextManager):
+        self.manager = manager
+
+    def adjust_schema(self, tool_name: str, schema: Dict[str, Any]) -> Dict[str, Any]:
+        """Make cart_id optional so the model can rely on the tracked cart."""
+        if tool_name not in CART_TOOLS:
+            return schema
+
+        schema["required"] = [name for name in schema.get("required", []) if name != "cart_id"]
+        properties = dict(schema.get("properties", {}))
+        if "cart_id" in properties:
+            properties["cart_id"] = {
+                **properties["cart_id"],
+                "description": "Cart ID (optional - defaults to the user's active cart)",
+            }
+        schema["properties"] = properties
+        return schema
+
+    async def intercept(self, call: ToolCall, call_next: CallNext) -> ToolResult:
+        """Inject cart_id, short-circuit read-only cart checks and record cart changes."""
+        if call.name not in CART_TOOLS or not call.user_id:
+            return await call_next(call)
+
+        active_cart_id = self.manager.get_cart_id(call.user_id)
+        if call.arguments.get("cart_id") is None:
+            call.arguments.pop("cart_id", None)
+            if active_cart_id is not None:
+                call.arguments["cart_id"] = active_cart_id
+                logger.debug(f"Injected active cart {active_cart_id} into {call.name}")
+            elif call.name != "add_to_cart":
+                return text_result("🛒 You don't have an active cart yet. Add a product to create one.")
+
+        if call.name == "get_cart":
+            local_cart = self.manager.render_cart(call.user_id, int(call.arguments["cart_id"]))
+            if local_cart:
+                logger.debug(f"Served cart {call.arguments['cart_id']} from local mirror")
+                return text_result(local_cart)
+
+        result = await call_next(call)
+        self.manager.record_tool_result(call.user_id, call.name, call.arguments, result_text(result))
+        return result
+
+
+# Global cart context manager instance
+cart_context_manager = CartContextManager()
@@ -0,0 +1,283 @@
+"""Local product catalog mirror with an inverted token index for fast searches."""
+import asyncio
+import bisect
+import json
+import re
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set
+from loguru import logger
+from app.config import settings
+from app.services.circuit_breaker import MCP_TOOLS, circuit_breakers
+from app.services.tool_pipeline import CallNext, ToolCall, ToolInterceptor, ToolResult, text_result
+
+
+PRODUCTS_RESOURCE_URI = "shopping://products"
+CATEGORIES_RESOURCE_URI = "shopping://categories"
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase alphanumeric tokens."""
+    return _TOKEN_PATTERN.findall(text.lower())
+
+
+@dataclass
+class CatalogIndex:
+    """Immutable snapshot of the catalog and its search structures."""
+    products: List[Dict[str, Any]] = field(default_factory=list)
+    categories: List[str] = field(default_factory=list)
+    tokens: Dict[str, Set[int]] = field(default_factory=dict)  # token -> product positions
+    sorted_tokens: List[str] = field(default_factory=list)  # for prefix lookups
+    category_facets: Dict[str, Set[int]] = field(default_factory=dict)  # lowercase category -> positions
+    loaded_at: Optional[datetime] = None
+
+    @classmethod
+    def build(cls, products: List[Dict[str, Any]], categories: List[str]) -> 'CatalogIndex':
+        """Build the inverted index and category facets from raw catalog data."""
+        tokens: Dict[str, Set[int]] = {}
+        category_facets: Dict[str, Set[int]] = {}
+
+        for position, product in enumerate(products):
+            category = str(product.get("category", ""))
+            text = f"{product.get('title', '')} {product.get('description', '')} {category}"
+            for token in tokenize(text):
+                tokens.setdefault(token, set()).add(position)
+            category_facets.setdefault(category.lower(), set()).add(position)
+
+        return cls(
+            products=products,
+            categories=categories or sorted({str(p.get("category", "")) for p in products}),
+            tokens=tokens,
+            sorted_tokens=sorted(tokens),
+            category_facets=category_facets,
+            loaded_at=datetime.now()
+        )
+
+    def _prefix_matches(self, prefix: str) -> Set[int]:
+        """Return positions of products containing any token starting with prefix."""
+        matches: Set[int] = set()
+        start = bisect.bisect_left(self.sorted_tokens, prefix)
+        for token in self.sorted_tokens[start:]:
+            if not token.startswith(prefix):
+                break
+            matches |= self.tokens[token]
+        return matches
+
+    def search(self, query: str, category: Optional[str] = None, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Search products by query tokens (prefix match, all tokens required).
+
+        This intentionally differs from the Node.js ProductCache, which matches
+        the whole query as a substring of title, description or category: a
+        token must start a word here, so "men" no longer matches women's
+        clothing, and multi-word queries such as "1tb ssd" match products
+        containing every word in any order where Node finds nothing. The Node
+        substring scan is only used as a fallback when the index finds nothing.
+
+        Args:
+            query: Search term
+            category: Optional exact category filter (case-insensitive)
+            limit: Maximum number of results
+
+        Returns:
+            Matching products in catalog order
+        """
+        candidates: Optional[Set[int]] = None
+        if category:
+            candidates = set(self.category_facets.get(category.lower(), set()))
+
+        matches: Optional[Set[int]] = None
+        for token in tokenize(query):
+            token_matches = self._prefix_matches(token)
+            matches = token_matches if matches is None else matches & token_matches
+            if not matches:
+                break
+
+        if not matches:
+            search_term = query.lower()
+            matches = {
+                position for position, product in enumerate(self.products)
+                if search_term in str(product.get("title", "")).lower()
+                or search_term in str(product.get("description", "")).lower()
+                or search_term in str(product.get("category", "")).lower()
+            }
+
+        if candidates is not None:
+            matches &= candidates
+
+        results = [self.products[position] for position in sorted(matches)]
+        if limit and limit > 0:
+            results = results[:limit]
+        return results
+
+    def rank(self, text: str, limit: int = 5) -> List[Dict[str, Any]]:
+        """
+        Rank products by how many words of free text they match (any word, not all).
+
+        Used for degraded answers when no LLM is available to build a query.
+
+        Args:
+            text: Free text such as the raw user message
+            limit: Maximum number of results
+
+        Returns:
+            Best matching products, highest score first
+        """
+        scores: Dict[int, int] = {}
+        for token in set(tokenize(text)):
+            if len(token) < 3:
+                continue
+            for position in self._prefix_matches(token):
+                scores[position] = scores.get(position, 0) + 1
+
+        ranked = sorted(scores, key=lambda position: (-scores[position], position))
+        return [self.products[position] for position in ranked[:limit]]
+
+
+class CatalogService:
+    """Keeps a local product catalog mirror loaded from MCP resources."""
+
+    def __init__(self, refresh_seconds: int = 600):
+        self.refresh_seconds = refresh_seconds
+        self._index = CatalogIndex()
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._mcp_client = None
+        logger.info("CatalogService initialized")
+
+    @property
+    def is_loaded(self) -> bool:
+        """True when a catalog snapshot is available."""
+        return self._index.loaded_at is not None
+
+    @property
+    def categories(self) -> List[str]:
+        """Categories from the current snapshot."""
+        return list(self._index.categories)
+
+    def is_stale(self) -> bool:
+        """True when the snapshot is missing or older than the refresh interval."""
+        if not self._index.loaded_at:
+            return True
+        return (datetime.now() - self._index.loaded_at).total_seconds() > self.refresh_seconds
+
+    async def refresh(self, mcp_client) -> bool:
+        """
+        Reload the catalog from the MCP server resources.
+
+        Args:
+            mcp_client: MultiServerMCPClient with a "shopping" server
+
+        Returns:
+            True if the catalog was refreshed, False on failure
+        """
+        try:
+            blobs = await circuit_breakers[MCP_TOOLS].call(
+                mcp_client.get_resources,
+                "shopping",
+                uris=[PRODUCTS_RESOURCE_URI, CATEGORIES_RESOURCE_URI]
+            )
+            resources = {str(blob.metadata.get("uri")): json.loads(blob.as_string()) for blob in blobs}
+
+            products = resources.get(PRODUCTS_RESOURCE_URI)
+            if not isinstance(products, list):
+                raise ValueError("Product catalog resource missing or malformed")
+
+            self._index = CatalogIndex.build(products, resources.get(CATEGORIES_RESOURCE_URI) or [])
+            logger.info(
+                f"Catalog mirror refreshed: {len(products)} products, "
+                f"{len(self._index.categories)} categories"
+            )
+            return True
+
+        except Exception as e:
+            logger.error(f"Failed to refresh catalog mirror: {e}")
+            return False
+
+    async def ensure_fresh(self, mcp_client) -> None:
+        """
+        Load the catalog if missing and keep a background refresh running.
+
+        Args:
+            mcp_client: Latest MCP client to use for refreshes
+        """
+        self._mcp_client = mcp_client
+        if not self.is_loaded:
+            await self.refresh(mcp_client)
+
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._refresh_loop())
+
+    async def _refresh_loop(self) -> None:
+        """Periodically refresh the catalog with the most recent MCP client."""
+        while True:
+            await asyncio.sleep(self.refresh_seconds)
+            if self._mcp_client is not None:
+                await self.refresh(self._mcp_client)
+
+    def search(self, query: str, category: Optional[str] = None, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Search the current snapshot (see CatalogIndex.search)."""
+        return self._index.search(query, category, limit)
+
+    def rank(self, text: str, limit: int = 5) -> List[Dict[str, Any]]:
+        """Rank products against free text (see CatalogIndex.rank)."""
+        return self._index.rank(text, limit)
+
+    async def close(self) -> None:
+        """Stop the background refresh task."""
+        if self._refresh_task and not self._refresh_task.done():
+            self._refresh_task.cancel()
+            try:
+                await self._refresh_task
+            except asyncio.CancelledError:
+                pass
+        self._refresh_task = None
+
+
+def format_search_results(results: List[Dict[str, Any]], query: str, category: Optional[str]) -> str:
+    """Format search results exactly like the Node.js search_products tool."""
+    scope = f" in category '{category}'" if category else ""
+    if not results:
+        return f"No products found matching '{query}'{scope}"
+
+    product_list = "\n\n".join(
+        f"{index}. {product.get('title')} - ${product.get('price')}\n"
+        f"   Category: {product.get('category')}\n"
+        f"   Rating: {(product.get('rating') or {}).get('rate')}/5 "
+        f"({(product.get('rating') or {}).get('count')} reviews)\n"
+        f"   Description: {str(product.get('description', ''))[:100]}..."
+        for index, product in enumerate(results, start=1)
+    )
+    plural = "s" if len(results) > 1 else ""
+    return f"Found {len(results)} product{plural} matching '{query}'{scope}:\n\n{product_list}"
+
+
+class CatalogSearchInterceptor(ToolInterceptor):
+    """Answers search_products and get_categories from the local catalog mirror."""
+
+    def __init__(self, catalog: CatalogService):
+        self.catalog = catalog
+
+    async def intercept(self, call: ToolCall, call_next: CallNext) -> ToolResult:
+        """Serve catalog reads locally when the mirror is loaded."""
+        if not self.catalog.is_loaded:
+            return await call_next(call)
+
+        if call.name == "search_products" and call.arguments.get("query"):
+            query = str(call.arguments["query"])
+            category = call.arguments.get("category")
+            limit = call.arguments.get("limit") or 20
+            results = self.catalog.search(query, category, int(limit))
+            logger.debug(f"Served search '{query}' from catalog mirror ({len(results)} results)")
+            return text_result(format_search_results(results, query, category))
+
+        if call.name == "get_categories":
+            categories = "\n".join(f"• {category}" for category in self.catalog.categories)
+            return text_result(f"📂 Available Categories:\n\n{categories}")
+
+        return await call_next(call)
+
+
+# Global catalog service instance
+catalog_service = CatalogService(refresh_seconds=settings.catalog_refresh_seconds)
@@ -0,0 +1,296 @@
+"""Circuit breakers for upstream dependencies (MCP auth, MCP tools, OpenAI)."""
+import asyncio
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Tuple, Type, TypeVar
+from uuid import UUID
+from langchain_core.callbacks import AsyncCallbackHandler
+from langchain_core.outputs import LLMResult
+from langchain_core.tools import ToolException
+from loguru import logger
+from app.config import settings
+from app.services.tool_pipeline import (
+    READ_ONLY_TOOLS,
+    CallNext,
+    ToolCall,
+    ToolInterceptor,
+    ToolResult,
+    result_text,
+    text_result,
+)
+
+
+T = TypeVar("T")
+
+# Tools whose last result may be served while the MCP server is failing. Carts are left out:
+# they change with every add/remove, and CartContextInterceptor would mirror a stale
+# snapshot as the current cart.
+DEGRADED_CACHE_TOOLS = READ_ONLY_TOOLS - {"get_cart"}
+
+# Breaker states
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Upstream names
+MCP_AUTH = "mcp_auth"
+MCP_TOOLS = "mcp_tools"
+OPENAI = "openai"
+
+
+class CircuitOpenError(Exception):
+    """Raised when a call is rejected because its circuit is open."""
+
+    def __init__(self, name: str, retry_after: float):
+        self.name = name
+        self.retry_after = retry_after
+        super().__init__(f"Circuit '{name}' is open - retry in {retry_after:.0f}s")
+
+
+class CircuitBreaker:
+    """
+    Failure-rate circuit breaker with half-open probing.
+
+    The breaker opens when, within the sliding window, at least min_calls
+    calls were made and the failure rate reaches failure_rate. While open,
+    calls are rejected immediately. After open_seconds a limited number of
+    probe calls are let through (half-open); a successful probe closes the
+    breaker, a failed one opens it again. A probe that produces no outcome
+    must give its slot back with release_probe(); a probe still unresolved
+    after open_seconds is treated as lost and its slot is freed.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_rate: float = 0.5,
+        min_calls: int = 5,
+        window_seconds: float = 60.0,
+        open_seconds: float = 30.0,
+        half_open_max_calls: int = 1
+    ):
+        self.name = name
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.window_seconds = window_seconds
+        self.open_seconds = open_seconds
+        self.half_open_max_calls = half_open_max_calls
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probes_in_flight = 0
+        self._probe_started_at = 0.0
+        self._outcomes: Deque[Tuple[float, bool]] = deque()  # (timestamp, succeeded)
+        self._lock = threading.RLock()
+
+    @property
+    def state(self) -> str:
+        """Current state, moving from open to half-open once the open period has elapsed."""
+        with self._lock:
+            if self._state == OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+                self._state = HALF_OPEN
+                self._probes_in_flight = 0
+                logger.info(f"Circuit '{self.name}' half-open - probing upstream")
+            elif (
+                self._state == HALF_OPEN
+                and self._probes_in_flight
+                and time.monotonic() - self._probe_started_at >= self.open_seconds
+            ):
+                logger.warning(f"Circuit '{self.name}' probe never completed - allowing a new probe")
+                self._probes_in_flight = 0
+            return self._state
+
+    def allow(self) -> bool:
+        """
+        Check whether a call may proceed (reserves a probe slot when half-open).
+
+        Returns:
+            True if the call may go ahead, False if it should fail fast
+        """
+        with self._lock:
+            state = self.state
+            if state == CLOSED:
+                return True
+            if state == HALF_OPEN and self._probes_in_flight < self.half_open_max_calls:
+                self._probes_in_flight += 1
+                self._probe_started_at = time.monotonic()
+                return True
+            return False
+
+    def retry_after(self) -> float:
+        """Seconds until the breaker will probe again."""
+        with self._lock:
+            if self._state != OPEN:
+                return 0.0
+            return max(0.0, self.open_seconds - (time.monotonic() - self._opened_at))
+
+    def record_success(self) -> None:
+        """Record a successful call."""
+        with self._lock:
+            if self._state == HALF_OPEN:
+                logger.info(f"Circuit '{self.name}' closed - upstream recovered")
+                self._state = CLOSED
+                self._outcomes.clear()
+            self._record(True)
+
+    def record_failure(self) -> None:
+        """Record a failed call, opening the breaker if the failure rate is too high."""
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._open()
+                return
+
+            self._record(False)
+            failures = sum(1 for _, succeeded in self._outcomes if not succeeded)
+            if (
+                self._state == CLOSED
+                and len(self._outcomes) >= self.min_calls
+                and failures / len(self._outcomes) >= self.failure_rate
+            ):
+                self._open()
+
+    async def call(self, func: Callable[..., Awaitable[T]], *args: Any, ignore: Tuple[Type[BaseException], ...] = (), **kwargs: Any) -> T:
+        """
+        Run an async call through the breaker.
+
+        Args:
+            func: Async callable
+            ignore: Exception types that mean the upstream is healthy (e.g. tool errors)
+
+        Returns:
+            The call result
+
+        Raises:
+            CircuitOpenError: If the breaker is open
+        """
+        if not self.allow():
+            raise CircuitOpenError(self.name, self.retry_after())
+
+        try:
+            result = await func(*args, **kwargs)
+        except asyncio.CancelledError:
+            self.release_probe()
+            raise
+        except ignore:
+            self.record_success()
+            raise
+        except Exception:
+            self.record_failure()
+            raise
+
+        self.record_success()
+        return result
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get breaker state and recent failure rate."""
+        with self._lock:
+            self._trim()
+            failures = sum(1 for _, succeeded in self._outcomes if not succeeded)
+            return {
+                "state": self.state,
+                "calls": len(self._outcomes),
+                "failures": failures,
+                "retry_after": round(self.retry_after(), 1),
+            }
+
+    def _record(self, succeeded: bool) -> None:
+        """Append an outcome and drop those outside the window (caller holds the lock)."""
+        self._outcomes.append((time.monotonic(), succeeded))
+        self._trim()
+
+    def _trim(self) -> None:
+        """Drop outcomes older than the window (caller holds the lock)."""
+        cutoff = time.monotonic() - self.window_seconds
+        while self._outcomes and self._outcomes[0][0] < cutoff:
+            self._outcomes.popleft()
+
+    def _open(self) -> None:
+        """Open the breaker (caller holds the lock)."""
+        self._state = OPEN
+        self._opened_at = time.monotonic()
+        self._probes_in_flight = 0
+        logger.warning(f"Circuit '{self.name}' opened - failing fast for {self.open_seconds:.0f}s")
+
+    def release_probe(self) -> None:
+        """Give back a half-open probe slot for a call that ended without an outcome (e.g. cancelled)."""
+        with self._lock:
+            if self._state == HALF_OPEN and self._probes_in_flight > 0:
+                self._probes_in_flight -= 1
+
+
+class CircuitBreakerCallbackHandler(AsyncCallbackHandler):
+    """Feeds LLM call outcomes into a circuit breaker."""
+
+    def __init__(self, breaker: CircuitBreaker):
+        self.breaker = breaker
+        self.recorded = False  # True once any LLM call of the run produced an outcome
+
+    async def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        """Record a successful LLM call."""
+        self.recorded = True
+        self.breaker.record_success()
+
+    async def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        """Record a failed LLM call (cancellations are not upstream failures)."""
+        if not isinstance(error, asyncio.CancelledError):
+            self.recorded = True
+            self.breaker.record_failure()
+
+
+class CircuitBreakerInterceptor(ToolInterceptor):
+    """
+    Guards MCP tool calls with a circuit breaker.
+
+    Successful results of DEGRADED_CACHE_TOOLS are remembered per user and
+    arguments; while the MCP server is failing they are served (marked as
+    cached) instead of waiting for another timeout. Calls with no cached
+    result fail fast.
+    """
+
+    def __init__(self, breaker: CircuitBreaker, max_cached_results: int = 500):
+        self.breaker = breaker
+        self.max_cached_results = max_cached_results
+        self._last_results: "OrderedDict[Tuple[Any, ...], str]" = OrderedDict()
+
+    async def intercept(self, call: ToolCall, call_next: CallNext) -> ToolResult:
+        """Call through the breaker, degrading to cached results on failure."""
+        cache_key = (call.user_id, call.name, tuple(sorted((k, str(v)) for k, v in call.arguments.items())))
+        try:
+            result = await self.breaker.call(call_next, call, ignore=(ToolException,))
+        except (ToolException, asyncio.CancelledError):
+            raise
+        except Exception as e:
+            logger.warning(f"MCP tool {call.name} unavailable ({e}) - degrading")
+            cached = self._last_results.get(cache_key) if call.name in DEGRADED_CACHE_TOOLS else None
+            if cached is not None:
+                return text_result(f"{cached}\n\n(Cached result - the store service is temporarily unavailable.)")
+            raise ToolException("The store service is temporarily unavailable. Please try again in a moment.")
+
+        if call.name in DEGRADED_CACHE_TOOLS:
+            self._last_results[cache_key] = result_text(result)
+            self._last_results.move_to_end(cache_key)
+            while len(self._last_results) > self.max_cached_results:
+                self._last_results.popitem(last=False)
+        return result
+
+
+def get_circuit_stats() -> Dict[str, Dict[str, Any]]:
+    """Get the state of every breaker."""
+    return {name: breaker.get_stats() for name, breaker in circuit_breakers.items()}
+
+
+def _create_breaker(name: str) -> CircuitBreaker:
+    """Create a breaker with the configured thresholds."""
+    return CircuitBreaker(
+        name,
+        failure_rate=settings.circuit_failure_rate,
+        min_calls=settings.circuit_min_calls,
+        window_seconds=settings.circuit_window_seconds,
+        open_seconds=settings.circuit_open_seconds
+    )
+
+
+# Global circuit breakers, one per upstream
+circuit_breakers: Dict[str, CircuitBreaker] = {
+    name: _create_breaker(name) for name in (MCP_AUTH, MCP_TOOLS, OPENAI)
+}
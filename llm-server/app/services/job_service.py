@@ -0,0 +1,203 @@
+"""Asynchronous chat jobs processed by a bounded in-process worker pool."""
+import asyncio
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from loguru import logger
+from app.config import settings
+from app.services.llm_service import llm_service
+
+
+# Job statuses
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED_STATUSES = {COMPLETED, FAILED, CANCELLED}
+
+
+@dataclass
+class ChatJob:
+    """A chat message queued for background processing."""
+    message: str
+    user_id: Optional[str] = None
+    job_id: str = field(default_factory=lambda: f"job_{uuid.uuid4().hex}")
+    status: str = QUEUED
+    result: Optional[str] = None
+    error: Optional[str] = None
+    created_at: datetime = field(default_factory=datetime.now)
+    finished_at: Optional[datetime] = None
+    done: asyncio.Event = field(default_factory=asyncio.Event)
+    task: Optional[asyncio.Task] = None
+
+    def finish(self, status: str, result: Optional[str] = None, error: Optional[str] = None) -> None:
+        """Mark the job as finished and wake up any waiters."""
+        self.status = status
+        self.result = result
+        self.error = error
+        self.finished_at = datetime.now()
+        self.done.set()
+
+
+class ChatJobManager:
+    """
+    Runs chat jobs on a fixed number of asyncio workers fed by a bounded queue.
+
+    Results are kept for a TTL after the job finishes, so clients can poll or
+    long-poll for them without holding a connection for the whole agent run.
+    """
+
+    def __init__(self, workers: int = 4, queue_size: int = 100, ttl_seconds: int = 600):
+        self.workers = workers
+        self.ttl = timedelta(seconds=ttl_seconds)
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self._jobs: Dict[str, ChatJob] = {}
+        self._worker_tasks: List[asyncio.Task] = []
+        logger.info(f"ChatJobManager initialized with {workers} workers")
+
+    def submit(self, message: str, user_id: Optional[str] = None) -> Optional[ChatJob]:
+        """
+        Queue a chat message for processing.
+
+        Args:
+            message: User message
+            user_id: Authenticated user ID (if any)
+
+        Returns:
+            The queued job, or None if the queue is full
+        """
+        self._ensure_workers()
+        self.cleanup_expired()
+
+        job = ChatJob(message=message, user_id=user_id)
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            logger.warning("Chat job queue is full - rejecting job")
+            return None
+
+        self._jobs[job.job_id] = job
+        logger.info(f"Queued chat job {job.job_id} (queue size: {self._queue.qsize()})")
+        return job
+
+    def get_job(self, job_id: str, user_id: Optional[str] = None) -> Optional[ChatJob]:
+        """
+        Get a job owned by the given user.
+
+        Args:
+            job_id: Job identifier
+            user_id: User requesting the job (must match the submitter)
+
+        Returns:
+            The job if found, not expired and owned by the user, None otherwise
+        """
+        self.cleanup_expired()
+        job = self._jobs.get(job_id)
+        if not job or job.user_id != user_id:
+            return None
+        return job
+
+    async def wait(self, job: ChatJob, timeout: float) -> ChatJob:
+        """
+        Long-poll: wait up to timeout seconds for a job to finish.
+
+        Args:
+            job: Job to wait for
+            timeout: Maximum seconds to wait
+
+        Returns:
+            The job (finished or not)
+        """
+        if timeout > 0 and not job.done.is_set():
+            try:
+                await asyncio.wait_for(job.done.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+        return job
+
+    def cancel(self, job: ChatJob) -> bool:
+        """
+        Cancel a queued or running job.
+
+        Returns:
+            True if the job was cancelled, False if it had already finished
+        """
+        if job.status in FINISHED_STATUSES:
+            return False
+
+        if job.task and not job.task.done():
+            job.task.cancel()
+        job.finish(CANCELLED)
+        logger.info(f"Cancelled chat job {job.job_id}")
+        return True
+
+    def cleanup_expired(self) -> int:
+        """
+        Remove finished jobs older than the TTL.
+
+        Returns:
+            Number of expired jobs removed
+        """
+        cutoff = datetime.now() - self.ttl
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.finished_at and job.finished_at < cutoff
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+        return len(expired)
+
+    def get_stats(self) -> Dict[str, int]:
+        """Get job counts by status plus queue depth."""
+        stats: Dict[str, int] = {"queue_size": self._queue.qsize(), "workers": len(self._worker_tasks)}
+        for job in self._jobs.values():
+            stats[job.status] = stats.get(job.status, 0) + 1
+        return stats
+
+    async def close(self) -> None:
+        """Stop the workers and cancel unfinished jobs."""
+        # Workers first: a worker only swallows a CancelledError for a job that is already CANCELLED
+        for task in self._worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks = []
+        for job in list(self._jobs.values()):
+            self.cancel(job)
+
+    def _ensure_workers(self) -> None:
+        """Start the worker tasks on first use (needs a running event loop)."""
+        self._worker_tasks = [task for task in self._worker_tasks if not task.done()]
+        while len(self._worker_tasks) < self.workers:
+            self._worker_tasks.append(asyncio.create_task(self._worker(len(self._worker_tasks))))
+
+    async def _worker(self, worker_id: int) -> None:
+        """Process queued jobs one at a time."""
+        while True:
+            job: ChatJob = await self._queue.get()
+            try:
+                if job.status != QUEUED:
+                    continue  # Cancelled while waiting in the queue
+
+                job.status = RUNNING
+                logger.info(f"Worker {worker_id} running chat job {job.job_id}")
+                job.task = asyncio.create_task(llm_service.chat(job.message, user_id=job.user_id))
+                try:
+                    job.finish(COMPLETED, result=await job.task)
+                except asyncio.CancelledError:
+                    if job.status != CANCELLED:
+                        raise  # The worker itself is being stopped (this also cancelled job.task)
+                except Exception as e:
+                    logger.error(f"Chat job {job.job_id} failed: {e}")
+                    job.finish(FAILED, error=str(e))
+            finally:
+                self._queue.task_done()
+
+
+# Global chat job manager instance
+chat_job_manager = ChatJobManager(
+    workers=settings.chat_job_workers,
+    queue_size=settings.chat_job_queue_size,
+    ttl_seconds=settings.chat_job_ttl_seconds
+)
@@ -1,11 +1,59 @@
 """LLM Service using langchain-mcp-adapters for intelligent tool usage."""
+import asyncio
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
 from langchain_mcp_adapters.client import MultiServerMCPClient
+from langgraph.errors import GraphRecursionError
 from langgraph.prebuilt import create_react_agent
 from langchain_openai import ChatOpenAI
 from loguru import logger
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 from app.config import settings
+from app.services.agent_budget import (
+    STOP_INSTRUCTION,
+    AgentBudget,
+    BudgetInterceptor,
+    current_budget,
+    strip_pending_tool_calls,
+)
 from app.services.api_key_manager import api_key_manager
+from app.services.cart_context import CartContextInterceptor, cart_context_manager
+from app.services.catalog_service import CatalogSearchInterceptor, catalog_service
+from app.services.circuit_breaker import (
+    CLOSED,
+    HALF_OPEN,
+    MCP_TOOLS,
+    OPENAI,
+    CircuitBreakerCallbackHandler,
+    CircuitBreakerInterceptor,
+    circuit_breakers,
+)
+from app.services.metrics import (
+    MetricsCallbackHandler,
+    MetricsInterceptor,
+    RequestStats,
+    chat_metrics,
+    current_request_stats,
+)
+from app.services.mcp_session_pool import SYSTEM_SESSION_KEY, mcp_session_pool, session_key
+from app.services.recorder import RecordingInterceptor, ReplayChatModel, chat_recorder, current_run
+from app.services.replica_router import replica_router
+from app.services.speculative_prefetch import (
+    SpeculativePrefetch,
+    SpeculativePrefetchInterceptor,
+    current_prefetch,
+    predict_tool_calls,
+)
+from app.services.tool_compaction import ToolResultCompactor, expand_tool_results
+from app.services.tool_pipeline import ToolCall, ToolPipeline, ToolResult, current_user_id
+
+
+# Prompt hints for known categories; the category list itself comes from the live catalog
+CATEGORY_HINTS = {
+    "electronics": "phones, laptops, computers, accessories",
+    "jewelery": "rings, necklaces, bracelets, earrings",
+    "men's clothing": "shirts, pants, jackets, shoes for men",
+    "women's clothing": "dresses, tops, jackets, shoes for women",
+}
 
 
 class LLMService:
@@ -13,8 +61,26 @@ class LLMService:
 
     def __init__(self):
         self.llm = None
-        self.agent = None
+        self.agents: Dict[str, Any] = {}  # session key -> ReAct agent bound to that user's pooled tools
+        self._agent_api_keys: Dict[str, str] = {}  # session key -> MCP API key the agent was built with
         self.mcp_client = None
+        self.prefetch_interceptor = SpeculativePrefetchInterceptor()
+        self.tool_pipeline = ToolPipeline([
+            MetricsInterceptor(),
+            BudgetInterceptor(),
+            RecordingInterceptor(chat_recorder),
+            ToolResultCompactor(
+                enabled=settings.tool_compaction_enabled,
+                max_items=settings.tool_compaction_max_items,
+                description_chars=settings.tool_compaction_description_chars,
+                max_chars=settings.tool_compaction_max_chars,
+                fields=settings.tool_compaction_fields
+            ),
+            CartContextInterceptor(cart_context_manager),
+            self.prefetch_interceptor,
+            CatalogSearchInterceptor(catalog_service),
+            CircuitBreakerInterceptor(circuit_breakers[MCP_TOOLS]),
+        ])
         self.is_initialized = False
 
         logger.info("LLMService instance created")
@@ -23,21 +89,31 @@ class LLMService:
         """
         Initialize LLM and MCP client.
 
+        Agents are cached per user and bound to that user's pooled MCP session,
+        so repeated calls only validate credentials.
+
         Args:
             user_id: User ID to get MCP API key from session storage.
                     If None, will use environment variable (fallback mode)
         """
+        key = session_key(user_id)
+        if chat_recorder.is_replaying:
+            self._initialize_replay(key)
+            return
+
         try:
             logger.info(f"Initializing LLM Service for user: {user_id or 'system'}")
 
             # Initialize OpenAI LLM
-            self.llm = ChatOpenAI(
-                api_key=settings.openai_api_key,
-                model="gpt-4",
-                temperature=0.1,
-                max_tokens=1000
-            )
-            logger.info("OpenAI LLM initialized")
+            if self.llm is None:
+                self.llm = ChatOpenAI(
+                    api_key=settings.openai_api_key,
+                    model="gpt-4",
+                    temperature=0.1,
+                    max_tokens=1000,
+                    timeout=settings.openai_timeout_seconds
+                )
+                logger.info("OpenAI LLM initialized")
 
             # Get MCP API key - either from user session or environment
             mcp_api_key = None
@@ -45,7 +121,7 @@ class LLMService:
                 mcp_api_key = api_key_manager.get_mcp_api_key(user_id)
                 if not mcp_api_key:
                     logger.warning(f"No valid MCP API key found for user {user_id}")
-                    # Could fallback to env variable or raise error
+                    await self.end_user_session(user_id)
                     raise ValueError(f"No valid MCP API key for user {user_id}")
             else:
                 # Fallback to environment variable (for backward compatibility)
@@ -53,24 +129,38 @@ class LLMService:
                 if not mcp_api_key:
                     raise ValueError("No MCP API key available (neither from user session nor environment)")
 
-            # Initialize MCP Client with streamable HTTP transport
-            self.mcp_client = MultiServerMCPClient({
-                "shopping": {
-                    "transport": "streamable_http",
-                    "url": f"{settings.mcp_server_url}/mcp",
-                    "headers": {
-                        "X-MCP-API-Key": mcp_api_key
-                    }
+            if key in self.agents and self._agent_api_keys.get(key) == mcp_api_key:
+                logger.debug(f"Reusing agent and MCP session for {key}")
+                self.is_initialized = True
+                return
+
+            # MCP connection with streamable HTTP transport; users stay on the replica that issued
+            # their API key, the system session on the replica configured for MCP_API_KEY
+            replica_url = api_key_manager.get_mcp_server_url(user_id) if user_id else settings.mcp_system_replica_url
+            connection = {
+                "transport": "streamable_http",
+                "headers": {
+                    "X-MCP-API-Key": mcp_api_key
                 }
+            }
+            self.mcp_client = MultiServerMCPClient({
+                "shopping": {**connection, "url": f"{replica_url or replica_router.choose()}/mcp"}
             })
 
-            # Get tools from MCP server
+            # Load the local catalog mirror (no-op once loaded, refreshed in the background)
+            await catalog_service.ensure_fresh(self.mcp_client)
+
+            # Get tools from the user's persistent MCP session
             logger.info("Loading MCP tools...")
-            tools = await self.mcp_client.get_tools()
+            tools = self.tool_pipeline.wrap_tools(
+                await circuit_breakers[MCP_TOOLS].call(mcp_session_pool.get_tools, key, connection, replica_url)
+            )
             logger.info(f"Loaded {len(tools)} MCP tools")
+            await chat_recorder.record_tools(key, tools)
 
             # Create ReAct agent with default settings
-            self.agent = create_react_agent(self.llm, tools)
+            self.agents[key] = create_react_agent(self.llm, tools)
+            self._agent_api_keys[key] = mcp_api_key
             logger.info("ReAct agent created successfully")
 
             self.is_initialized = True
@@ -78,29 +168,105 @@ class LLMService:
 
         except Exception as e:
             logger.error(f"Failed to initialize LLM Service: {e}")
-            self.is_initialized = False
+            self.is_initialized = bool(self.agents)
             raise
 
-    async def chat(self, message: str) -> str:
-        """Process user message and return response."""
+    def _initialize_replay(self, key: str) -> None:
+        """Build an agent backed by the loaded cassette instead of OpenAI and MCP."""
+        if key in self.agents:
+            return
+
+        tools = self.tool_pipeline.wrap_tools(chat_recorder.replay_tools())
+        self.llm = ReplayChatModel(time_scale=chat_recorder.time_scale)
+        self.agents[key] = create_react_agent(self.llm, tools)
+        self.is_initialized = True
+        logger.info(f"Replay agent created for {key} with {len(tools)} recorded tools")
+
+    async def end_user_session(self, user_id: str) -> None:
+        """
+        Tear down a user's agent and persistent MCP session (logout, expired credentials).
+
+        Args:
+            user_id: User identifier
+        """
+        key = session_key(user_id)
+        self.agents.pop(key, None)
+        self._agent_api_keys.pop(key, None)
+        await mcp_session_pool.close_session(key)
+
+    async def cleanup_expired_sessions(self) -> int:
+        """
+        Tear down agents of users whose credentials have expired.
+
+        Returns:
+            Number of user sessions ended
+        """
+        expired = [
+            key for key in list(self.agents)
+            if key != SYSTEM_SESSION_KEY and not api_key_manager.has_valid_credentials(key)
+        ]
+        for key in expired:
+            await self.end_user_session(key)
+        if expired:
+            logger.info(f"Ended {len(expired)} expired user sessions")
+        return len(expired)
+
+    async def chat(self, message: str, user_id: Optional[str] = None) -> str:
+        """
+        Process user message and return response.
+
+        Args:
+            message: User message
+            user_id: Authenticated user ID, used for per-user tool state (e.g. active cart)
+
+        Raises:
+            asyncio.CancelledError: If the caller cancels the run (e.g. client disconnected);
+                work done so far is still recorded in metrics
+        """
+        user_token = current_user_id.set(user_id)
+        run = chat_recorder.start_exchange(user_id, message)
+        run_token = current_run.set(run)
+        stats = RequestStats()
+        stats_token = current_request_stats.set(stats)
+        budget_token = current_budget.set(AgentBudget(
+            max_tool_calls=settings.agent_max_tool_calls,
+            max_repeated_calls=settings.agent_max_repeated_calls,
+            similarity_threshold=settings.agent_repeat_similarity
+        ))
+        prefetch = SpeculativePrefetch()
+        prefetch_token = current_prefetch.set(prefetch)
+        openai_breaker = circuit_breakers[OPENAI]
+        breaker_handler = CircuitBreakerCallbackHandler(openai_breaker)
+        probing = False
+        outcome = "completed"
+        result = ""
         try:
             if not self.is_initialized:
                 logger.info("LLM Service not initialized, initializing now...")
                 await self.initialize()
 
-            if not self.agent:
+            # Fall back to the system agent when the user's could not be initialized
+            key = session_key(user_id) if session_key(user_id) in self.agents else SYSTEM_SESSION_KEY
+            agent = self.agents.get(key)
+            if not agent:
                 raise Exception("Agent not initialized")
 
             logger.info(f"Processing message: {message}")
 
+            # Answer from the catalog mirror instead of waiting on OpenAI while it is failing
+            probing = openai_breaker.state == HALF_OPEN
+            if not openai_breaker.allow():
+                probing = False
+                logger.warning("OpenAI circuit open - serving degraded answer")
+                outcome = "degraded"
+                result = self._degraded_answer(message)
+                return result
+
             # Enhance message with shopping context
             enhanced_message = f"""You are an intelligent shopping assistant with access to a fake store catalog.
 
 IMPORTANT - Available product categories (use these exact names):
-- "electronics" - phones, laptops, computers, accessories
-- "jewelery" - rings, necklaces, bracelets, earrings
-- "men's clothing" - shirts, pants, jackets, shoes for men
-- "women's clothing" - dresses, tops, jackets, shoes for women
+{self._format_categories()}
 
 When users search for clothing items like jackets, shirts, or pants:
 - For men's items: use category "men's clothing"
@@ -114,14 +280,29 @@ Use your tools to:
 4. remove_from_cart - Remove items from cart
 5. get_categories - Get all available categories
 
+The user's active cart is tracked automatically - omit cart_id to use it.
+
 Always be helpful and provide specific product details including prices and ratings.
 
 User request: {message}"""
 
+            # Hide likely tool round-trips behind the first LLM call
+            if settings.speculative_prefetch_enabled and not chat_recorder.is_replaying:
+                self._start_prefetch(prefetch, message, user_id, key)
+
             # Use the agent to process the enhanced message
-            response = await self.agent.ainvoke({
-                "messages": [{"role": "user", "content": enhanced_message}]
-            })
+            response = await self._run_agent(
+                agent,
+                {"messages": [HumanMessage(content=enhanced_message)]},
+                config={
+                    "callbacks": [
+                        MetricsCallbackHandler(stats),
+                        breaker_handler,
+                        *chat_recorder.callbacks(run)
+                    ],
+                    "recursion_limit": 2 * settings.agent_max_steps + 1
+                }
+            )
 
             # Extract the final message from the response
             if "messages" in response and response["messages"]:
@@ -137,12 +318,142 @@ User request: {message}"""
             logger.success(f"Generated response: {result[:100]}...")
             return result
 
+        except asyncio.CancelledError:
+            logger.warning("Chat processing cancelled")
+            outcome = "cancelled"
+            raise
         except Exception as e:
             logger.error(f"Error in chat processing: {e}")
-            return f"❌ I'm sorry, I encountered an error: {str(e)}"
+            if openai_breaker.state != CLOSED:
+                outcome = "degraded"
+                result = self._degraded_answer(message)
+            else:
+                outcome = "error"
+                result = f"❌ I'm sorry, I encountered an error: {str(e)}"
+            return result
+        finally:
+            if probing and not breaker_handler.recorded:
+                # The probe request ended without an LLM outcome (cancelled, stopped early) - free its slot
+                openai_breaker.release_probe()
+            for name, value in prefetch.finish().items():
+                chat_metrics.increment(f"prefetch_{name}", value)
+            chat_metrics.record_request(stats, outcome)
+            await chat_recorder.finish_exchange(run, session_key(user_id), result)
+            current_prefetch.reset(prefetch_token)
+            current_budget.reset(budget_token)
+            current_request_stats.reset(stats_token)
+            current_run.reset(run_token)
+            current_user_id.reset(user_token)
+
+    def _start_prefetch(self, prefetch: SpeculativePrefetch, message: str, user_id: Optional[str], key: str) -> None:
+        """
+        Start the read-only tool calls predicted for a message.
+
+        The calls run through the pipeline stages below the prefetch interceptor,
+        on the same pooled MCP session the agent's tools use.
+
+        Args:
+            prefetch: Per-request speculative call cache
+            message: User message
+            user_id: Authenticated user ID (if any)
+            key: Pool key of the agent handling the request
+        """
+        async def call_upstream(call: ToolCall) -> ToolResult:
+            return await mcp_session_pool.call_tool(key, call.name, call.arguments)
+
+        async def call_speculatively(call: ToolCall) -> ToolResult:
+            return await self.tool_pipeline.call_after(self.prefetch_interceptor, call, call_upstream)
+
+        for call in predict_tool_calls(message, user_id):
+            prefetch.start(call, call_speculatively)
+
+    async def _run_agent(self, agent, agent_input: Dict[str, Any], config: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Run the agent within its step, tool call and wall time budget.
+
+        When a limit is hit the run is stopped and a final, tool-free LLM call
+        produces a best-effort answer from the messages gathered so far; that
+        call gets whatever wall time is left plus agent_answer_grace_seconds.
+
+        Args:
+            agent: ReAct agent to run
+            agent_input: Initial agent state
+            config: Runnable config (callbacks, recursion limit)
+
+        Returns:
+            Final agent state with a "messages" list
+        """
+        budget = current_budget.get()
+        state: Dict[str, Any] = dict(agent_input)
+        deadline = asyncio.get_running_loop().time() + settings.agent_max_seconds
+
+        async def consume() -> bool:
+            nonlocal state
+            async for state in agent.astream(agent_input, config=config, stream_mode="values"):
+                if budget and budget.exhausted:
+                    return False
+            return True
+
+        try:
+            if await asyncio.wait_for(consume(), timeout=settings.agent_max_seconds):
+                return state
+            reason = budget.exhausted_reason
+        except asyncio.TimeoutError:
+            reason = f"time limit of {settings.agent_max_seconds}s"
+        except GraphRecursionError:
+            reason = f"step limit of {settings.agent_max_steps}"
+
+        logger.warning(f"Agent stopped early ({reason}) - generating best-effort answer")
+        chat_metrics.increment("agent_budget_stops")
+        messages = state.get("messages", [])
+        timeout = max(0.0, deadline - asyncio.get_running_loop().time()) + settings.agent_answer_grace_seconds
+        return {"messages": [*messages, await self._best_effort_answer(messages, config, timeout)]}
+
+    async def _best_effort_answer(self, messages: List[BaseMessage], config: Dict[str, Any], timeout: float) -> BaseMessage:
+        """Ask the (tool-less) LLM for a final answer from the conversation so far, within timeout seconds."""
+        # One last call with no further tool rounds - give it the full tool results, not the compact ones
+        history = expand_tool_results(strip_pending_tool_calls(messages))
+        try:
+            return await asyncio.wait_for(
+                self.llm.ainvoke(
+                    [*history, HumanMessage(content=STOP_INSTRUCTION)],
+                    config={"callbacks": config.get("callbacks", [])}
+                ),
+                timeout=timeout
+            )
+        except asyncio.TimeoutError:
+            logger.error(f"Best-effort answer timed out after {timeout:.1f}s")
+        except Exception as e:
+            logger.error(f"Best-effort answer failed: {e}")
+        return AIMessage(content="I couldn't finish that request in time. Could you make it a bit more specific?")
+
+    def _degraded_answer(self, message: str) -> str:
+        """Best-effort reply from the catalog mirror when the LLM is unavailable."""
+        products = catalog_service.rank(message, limit=5) if catalog_service.is_loaded else []
+        if not products:
+            return "❌ The AI assistant is temporarily unavailable. Please try again in a moment."
+
+        product_lines = "\n".join(
+            f"- **{product.get('title')}** - ${product.get('price')} ({product.get('category')})"
+            for product in products
+        )
+        return (
+            "⚠️ The AI assistant is temporarily unavailable, so I can't manage your cart right now. "
+            f"Here are catalog products matching your message:\n\n{product_lines}"
+        )
+
+    def _format_categories(self) -> str:
+        """Build the prompt's category list from the live catalog mirror."""
+        categories = catalog_service.categories or list(CATEGORY_HINTS)
+        return "\n".join(
+            f'- "{category}" - {CATEGORY_HINTS[category]}' if category in CATEGORY_HINTS else f'- "{category}"'
+            for category in categories
+        )
 
     async def close(self):
         """Cleanup resources."""
+        await catalog_service.close()
+        await mcp_session_pool.close_all()
         if self.mcp_client:
             # Note: Check if mcp_client has a close method
             if hasattr(self.mcp_client, 'close'):
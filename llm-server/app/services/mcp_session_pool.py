@@ -0,0 +1,298 @@
+"""Pool of long-lived MCP sessions, one per user, reused across chat requests."""
+import asyncio
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from langchain_core.tools import BaseTool, StructuredTool, ToolException
+from langchain_mcp_adapters.client import MultiServerMCPClient
+from langchain_mcp_adapters.tools import load_mcp_tools
+from loguru import logger
+from app.config import settings
+from app.services.api_key_manager import api_key_manager
+from app.services.replica_router import is_replica_failure, replica_router
+from app.services.tool_pipeline import READ_ONLY_TOOLS, ToolResult
+
+
+SYSTEM_SESSION_KEY = "system"  # Session key used when no user is authenticated
+SERVER_NAME = "shopping"
+
+
+def session_key(user_id: Optional[str]) -> str:
+    """Map a user ID (or None) to its pool key."""
+    return user_id or SYSTEM_SESSION_KEY
+
+
+@dataclass
+class PooledSession:
+    """A live MCP session owned by a background task."""
+    key: str
+    connection: Dict[str, Any]
+    replica_url: str
+    session: Any = None  # mcp.ClientSession
+    tools: Dict[str, BaseTool] = field(default_factory=dict)
+    created_at: datetime = field(default_factory=datetime.now)
+    last_used: datetime = field(default_factory=datetime.now)
+    in_flight: int = 0
+    closed: asyncio.Event = field(default_factory=asyncio.Event)
+    task: Optional[asyncio.Task] = None
+
+    @property
+    def is_alive(self) -> bool:
+        """True while the session is open."""
+        return self.session is not None and not self.closed.is_set()
+
+    def idle_seconds(self) -> float:
+        """Seconds since the session was last used."""
+        return (datetime.now() - self.last_used).total_seconds()
+
+
+class MCPSessionPool:
+    """
+    Keeps one streamable-HTTP MCP session per user open between requests.
+
+    Each session is entered and exited inside its own background task (the MCP
+    transport's task groups must be closed by the task that opened them); tool
+    calls from request tasks are routed to the live session for their user.
+    A session stays on the MCP replica it was opened on - the server keeps
+    session and cart state in memory - so only reconnects pick a new replica,
+    and users pinned to the replica holding their API key never move.
+    Sessions are health-checked with a tools/list request (the Node.js server
+    does not implement ping; a failed check reopens the session but is not
+    counted against the replica), closed after an idle timeout or
+    when the user's credentials expire, and reopened on the next call.
+    """
+
+    def __init__(self, idle_timeout_seconds: int = 900, health_check_seconds: int = 60, ping_timeout_seconds: float = 5.0):
+        self.idle_timeout_seconds = idle_timeout_seconds
+        self.health_check_seconds = health_check_seconds
+        self.ping_timeout_seconds = ping_timeout_seconds
+        self._entries: Dict[str, PooledSession] = {}
+        self._connections: Dict[str, Dict[str, Any]] = {}
+        self._pinned_urls: Dict[str, Optional[str]] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._maintenance_task: Optional[asyncio.Task] = None
+        logger.info("MCPSessionPool initialized")
+
+    async def get_tools(self, key: str, connection: Dict[str, Any], replica_url: Optional[str] = None) -> List[BaseTool]:
+        """
+        Get tools for a user backed by the pooled session.
+
+        Args:
+            key: Pool key (see session_key)
+            connection: MultiServerMCPClient connection config for the shopping server (without "url")
+            replica_url: Replica the user is pinned to; if None the replica router picks one per session
+
+        Returns:
+            Tools whose calls are routed through the pool (survive reconnects)
+        """
+        if self._connections.get(key) != connection or self._pinned_urls.get(key) != replica_url:
+            # New or changed credentials - drop any session opened with the old ones
+            await self.close_session(key)
+            self._connections[key] = connection
+            self._pinned_urls[key] = replica_url
+
+        entry = await self._acquire(key)
+        return [self._pooled_tool(key, tool) for tool in entry.tools.values()]
+
+    async def call_tool(self, key: str, name: str, arguments: Dict[str, Any]) -> ToolResult:
+        """
+        Call a tool on the user's pooled session, reconnecting on transport failure.
+
+        Read-only tools are retried once on a fresh session; tools that change
+        state are not retried since the first attempt may have been applied.
+
+        Args:
+            key: Pool key
+            name: Tool name
+            arguments: Tool arguments
+
+        Returns:
+            Tool result
+        """
+        for attempt in (1, 2):
+            entry = await self._acquire(key)
+            tool = entry.tools.get(name)
+            if not tool:
+                raise ToolException(f"Unknown tool: {name}")
+
+            entry.last_used = datetime.now()
+            entry.in_flight += 1
+            try:
+                async with replica_router.track(entry.replica_url):
+                    return await tool.coroutine(**arguments)
+            except ToolException:
+                raise
+            except Exception as e:
+                logger.warning(f"MCP session for {key} failed during {name} (attempt {attempt}): {e}")
+                await self._close_entry(entry)
+                if attempt == 2 or name not in READ_ONLY_TOOLS:
+                    raise
+            finally:
+                entry.in_flight -= 1
+                entry.last_used = datetime.now()
+
+    async def close_session(self, key: str) -> bool:
+        """
+        Tear down the session for a key (logout, expired credentials).
+
+        Args:
+            key: Pool key
+
+        Returns:
+            True if a session was closed, False if none was open
+        """
+        self._connections.pop(key, None)
+        self._pinned_urls.pop(key, None)
+        entry = self._entries.pop(key, None)
+        if not entry:
+            return False
+
+        await self._close_entry(entry)
+        logger.info(f"Closed MCP session for {key}")
+        return True
+
+    async def close_all(self) -> None:
+        """Close every session and stop maintenance."""
+        if self._maintenance_task and not self._maintenance_task.done():
+            self._maintenance_task.cancel()
+            try:
+                await self._maintenance_task
+            except asyncio.CancelledError:
+                pass
+        self._maintenance_task = None
+
+        for key in list(self._entries):
+            await self.close_session(key)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get pool statistics for status endpoints."""
+        sessions_per_replica: Dict[str, int] = {}
+        for entry in self._entries.values():
+            if entry.is_alive:
+                sessions_per_replica[entry.replica_url] = sessions_per_replica.get(entry.replica_url, 0) + 1
+
+        return {
+            "open_sessions": sum(sessions_per_replica.values()),
+            "in_flight_calls": sum(entry.in_flight for entry in self._entries.values()),
+            "sessions_per_replica": sessions_per_replica,
+        }
+
+    async def _acquire(self, key: str) -> PooledSession:
+        """Return a live session for key, opening one if needed."""
+        entry = self._entries.get(key)
+        if entry and entry.is_alive:
+            return entry
+
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            entry = self._entries.get(key)
+            if entry and entry.is_alive:
+                return entry
+
+            connection = self._connections.get(key)
+            if not connection:
+                raise ValueError(f"No MCP connection configured for {key}")
+
+            entry = await self._open(key, connection, self._pinned_urls.get(key) or replica_router.choose())
+            self._entries[key] = entry
+            self._ensure_maintenance()
+            return entry
+
+    async def _open(self, key: str, connection: Dict[str, Any], replica_url: str) -> PooledSession:
+        """Open a session on a replica in a dedicated task and wait until its tools are loaded."""
+        entry = PooledSession(key=key, connection={**connection, "url": f"{replica_url}/mcp"}, replica_url=replica_url)
+        ready: asyncio.Future = asyncio.get_running_loop().create_future()
+        entry.task = asyncio.create_task(self._run_session(entry, ready))
+        try:
+            await ready
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            if is_replica_failure(e):
+                replica_router.record_failure(replica_url)
+            raise
+        logger.info(f"Opened MCP session for {key} on {replica_url} with {len(entry.tools)} tools")
+        return entry
+
+    async def _run_session(self, entry: PooledSession, ready: asyncio.Future) -> None:
+        """Own the session context for its whole lifetime."""
+        try:
+            client = MultiServerMCPClient({SERVER_NAME: entry.connection})
+            async with client.session(SERVER_NAME) as session:
+                entry.session = session
+                entry.tools = {tool.name: tool for tool in await load_mcp_tools(session)}
+                ready.set_result(True)
+                await entry.closed.wait()
+        except asyncio.CancelledError:
+            if not ready.done():
+                ready.cancel()
+        except Exception as e:
+            if not ready.done():
+                ready.set_exception(e)
+            else:
+                logger.warning(f"MCP session for {entry.key} ended with error: {e}")
+        finally:
+            entry.closed.set()
+
+    async def _close_entry(self, entry: PooledSession) -> None:
+        """Signal the session task to exit and wait for it."""
+        entry.closed.set()
+        if entry.task and entry.task is not asyncio.current_task():
+            try:
+                await asyncio.wait_for(asyncio.shield(entry.task), timeout=self.ping_timeout_seconds)
+            except asyncio.TimeoutError:
+                entry.task.cancel()
+            except Exception:
+                pass  # Errors are already logged by the session task
+        if self._entries.get(entry.key) is entry:
+            del self._entries[entry.key]
+
+    def _pooled_tool(self, key: str, tool: BaseTool) -> BaseTool:
+        """Build a tool that routes calls through the pool instead of a fixed session."""
+        async def call_tool(**arguments: Any) -> ToolResult:
+            return await self.call_tool(key, tool.name, arguments)
+
+        return StructuredTool(
+            name=tool.name,
+            description=tool.description,
+            args_schema=tool.args_schema,
+            coroutine=call_tool,
+            response_format=tool.response_format,
+            metadata=tool.metadata,
+        )
+
+    def _ensure_maintenance(self) -> None:
+        """Start the maintenance loop if it is not running."""
+        if self._maintenance_task is None or self._maintenance_task.done():
+            self._maintenance_task = asyncio.create_task(self._maintenance_loop())
+
+    async def _maintenance_loop(self) -> None:
+        """Close idle or unauthorized sessions and health-check the rest."""
+        while True:
+            await asyncio.sleep(self.health_check_seconds)
+            for key, entry in list(self._entries.items()):
+                if entry.in_flight:
+                    continue
+
+                if key != SYSTEM_SESSION_KEY and not api_key_manager.has_valid_credentials(key):
+                    logger.info(f"Credentials for {key} expired - closing MCP session")
+                    await self.close_session(key)
+                elif entry.idle_seconds() > self.idle_timeout_seconds:
+                    logger.info(f"MCP session for {key} idle for {entry.idle_seconds():.0f}s - closing")
+                    await self._close_entry(entry)
+                elif not entry.is_alive:
+                    await self._close_entry(entry)
+                elif entry.idle_seconds() > self.health_check_seconds:
+                    try:
+                        await asyncio.wait_for(entry.session.list_tools(), timeout=self.ping_timeout_seconds)
+                    except Exception as e:
+                        # Not fed to the replica router: only real traffic decides ejection
+                        logger.warning(f"Health check failed for MCP session {key}: {e}")
+                        await self._close_entry(entry)
+
+
+# Global MCP session pool instance
+mcp_session_pool = MCPSessionPool(
+    idle_timeout_seconds=settings.mcp_session_idle_timeout_seconds,
+    health_check_seconds=settings.mcp_session_health_check_seconds
+)
@@ -0,0 +1,106 @@
+"""In-process metrics for chat requests, LLM calls and tool calls."""
+import threading
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+from uuid import UUID
+from langchain_core.callbacks import AsyncCallbackHandler
+from langchain_core.outputs import LLMResult
+from loguru import logger
+from app.services.tool_pipeline import CallNext, ToolCall, ToolInterceptor, ToolResult
+
+
+@dataclass
+class RequestStats:
+    """Work done by a single chat request."""
+    started_at: float = field(default_factory=time.perf_counter)
+    llm_calls: int = 0
+    tool_calls: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+
+    def elapsed_ms(self) -> float:
+        """Milliseconds since the request started."""
+        return (time.perf_counter() - self.started_at) * 1000
+
+
+# Stats for the chat request currently being processed
+current_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("current_request_stats", default=None)
+
+
+class MetricsCallbackHandler(AsyncCallbackHandler):
+    """Counts LLM calls and token usage for one request."""
+
+    def __init__(self, stats: RequestStats):
+        self.stats = stats
+
+    async def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        """Record a completed LLM call."""
+        self.stats.llm_calls += 1
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        self.stats.prompt_tokens += usage.get("prompt_tokens", 0)
+        self.stats.completion_tokens += usage.get("completion_tokens", 0)
+
+
+class MetricsInterceptor(ToolInterceptor):
+    """Counts tool calls for the current request."""
+
+    async def intercept(self, call: ToolCall, call_next: CallNext) -> ToolResult:
+        """Count the call once it has completed (successfully or not)."""
+        try:
+            return await call_next(call)
+        finally:
+            stats = current_request_stats.get()
+            if stats:
+                stats.tool_calls += 1
+
+
+class ChatMetrics:
+    """Thread-safe aggregate counters for chat requests, by outcome."""
+
+    def __init__(self):
+        self._counters: Dict[str, float] = {}
+        self._lock = threading.RLock()
+        logger.info("ChatMetrics initialized")
+
+    def increment(self, name: str, value: float = 1) -> None:
+        """
+        Increment a named counter.
+
+        Args:
+            name: Counter name
+            value: Amount to add (default 1)
+        """
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def record_request(self, stats: RequestStats, outcome: str) -> None:
+        """
+        Record the work done by a finished chat request.
+
+        Args:
+            stats: Stats collected during the request
+            outcome: "completed", "error" or "cancelled"
+        """
+        with self._lock:
+            self.increment(f"requests_{outcome}")
+            self.increment(f"llm_calls_{outcome}", stats.llm_calls)
+            self.increment(f"tool_calls_{outcome}", stats.tool_calls)
+            self.increment("prompt_tokens", stats.prompt_tokens)
+            self.increment("completion_tokens", stats.completion_tokens)
+            self.increment(f"duration_ms_{outcome}", stats.elapsed_ms())
+
+        logger.info(
+            f"Chat request {outcome}: {stats.llm_calls} LLM calls, {stats.tool_calls} tool calls, "
+            f"{stats.elapsed_ms():.0f}ms"
+        )
+
+    def get_stats(self) -> Dict[str, float]:
+        """Get a snapshot of all counters."""
+        with self._lock:
+            return {name: round(value, 1) for name, value in sorted(self._counters.items())}
+
+
+# Global chat metrics instance
+chat_metrics = ChatMetrics()
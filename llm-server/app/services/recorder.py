@@ -0,0 +1,363 @@
+"""Record/replay harness capturing LLM and MCP tool exchanges into cassette files."""
+import asyncio
+import json
+import re
+import threading
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import UUID
+from langchain_core.callbacks import AsyncCallbackHandler
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, messages_from_dict, messages_to_dict
+from langchain_core.outputs import ChatGeneration, ChatResult, LLMResult
+from langchain_core.tools import BaseTool, StructuredTool, ToolException
+from loguru import logger
+from app.config import settings
+from app.services.tool_pipeline import (
+    CallNext,
+    ToolCall,
+    ToolInterceptor,
+    ToolResult,
+    result_text,
+    text_result,
+)
+
+
+RECORD_MODES = {"off", "record"}  # Replay is only entered through load_cassette()
+
+
+@dataclass
+class ExchangeRun:
+    """LLM and tool activity for one chat request (recorded or replayed)."""
+    message: str
+    user_id: Optional[str] = None
+    started_at: float = field(default_factory=time.perf_counter)
+    duration_ms: float = 0.0
+    response: Optional[str] = None
+    llm_calls: List[Dict[str, Any]] = field(default_factory=list)
+    tool_calls: List[Dict[str, Any]] = field(default_factory=list)
+    source: Optional[Dict[str, Any]] = None  # Recorded exchange being replayed
+    extra_llm_calls: int = 0  # Replay: LLM calls beyond the recording
+    extra_tool_calls: int = 0  # Replay: tool calls with no recorded result
+    _llm_cursor: int = 0
+    _used_tools: set = field(default_factory=set)
+
+    def next_llm_response(self) -> Tuple[Optional[Dict[str, Any]], float]:
+        """Replay: pop the next recorded LLM response and its duration."""
+        recorded = (self.source or {}).get("llm_calls", [])
+        if self._llm_cursor >= len(recorded):
+            return None, 0.0
+        entry = recorded[self._llm_cursor]
+        self._llm_cursor += 1
+        return entry["response"], entry.get("duration_ms", 0.0)
+
+    def match_tool_call(self, name: str, arguments: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Replay: find an unused recorded tool call, preferring identical arguments."""
+        recorded = (self.source or {}).get("tool_calls", [])
+        fallback = None
+        for index, entry in enumerate(recorded):
+            if index in self._used_tools or entry["name"] != name:
+                continue
+            if entry["arguments"] == arguments:
+                self._used_tools.add(index)
+                return entry
+            if fallback is None:
+                fallback = index
+
+        if fallback is None:
+            return None
+        self._used_tools.add(fallback)
+        return recorded[fallback]
+
+    def summary(self) -> Dict[str, Any]:
+        """Counts and timings used by replay reports."""
+        return {
+            "message": self.message,
+            "llm_calls": len(self.llm_calls),
+            "tool_calls": len(self.tool_calls),
+            "extra_llm_calls": self.extra_llm_calls,
+            "extra_tool_calls": self.extra_tool_calls,
+            "duration_ms": round(self.duration_ms, 1),
+        }
+
+
+# Exchange for the chat request currently being processed
+current_run: ContextVar[Optional[ExchangeRun]] = ContextVar("current_run", default=None)
+
+
+class RecordingCallbackHandler(AsyncCallbackHandler):
+    """Captures every chat model request/response of one exchange."""
+
+    def __init__(self, run: ExchangeRun):
+        self.run = run
+        self._pending: Dict[UUID, Tuple[float, List[Dict[str, Any]]]] = {}
+
+    async def on_chat_model_start(self, serialized: Dict[str, Any], messages: List[List[BaseMessage]], *, run_id: UUID, **kwargs: Any) -> None:
+        """Remember the request messages and start time."""
+        self._pending[run_id] = (time.perf_counter(), messages_to_dict(messages[0]) if messages else [])
+
+    async def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        """Store the request/response pair with its latency and token usage."""
+        started_at, request_messages = self._pending.pop(run_id, (time.perf_counter(), []))
+        generation = response.generations[0][0] if response.generations and response.generations[0] else None
+        message = getattr(generation, "message", None)
+        self.run.llm_calls.append({
+            "messages": request_messages,
+            "response": messages_to_dict([message])[0] if message else None,
+            "token_usage": (response.llm_output or {}).get("token_usage"),
+            "duration_ms": (time.perf_counter() - started_at) * 1000,
+        })
+
+
+class ReplayChatModel(BaseChatModel):
+    """Stand-in chat model returning the recorded LLM responses in order."""
+
+    time_scale: float = 1.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "replay"
+
+    def bind_tools(self, tools: Any, **kwargs: Any) -> "ReplayChatModel":
+        """Tools are already encoded in the recorded responses."""
+        return self
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        raise NotImplementedError("ReplayChatModel only supports async invocation")
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        """Return the next recorded response, sleeping for its scaled latency."""
+        run = current_run.get()
+        recorded, duration_ms = run.next_llm_response() if run else (None, 0.0)
+
+        if recorded is None:
+            # The code under test asked for more LLM turns than were recorded - end the loop
+            if run:
+                run.extra_llm_calls += 1
+            message = AIMessage(content="[replay] no recorded LLM response")
+        else:
+            message = messages_from_dict([recorded])[0]
+
+        if self.time_scale > 0 and duration_ms:
+            await asyncio.sleep(duration_ms / 1000 * self.time_scale)
+
+        if run:
+            run.llm_calls.append({"response": messages_to_dict([message])[0], "duration_ms": duration_ms})
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+class RecordingInterceptor(ToolInterceptor):
+    """Records tool calls as the agent issued them, or answers them from a cassette."""
+
+    def __init__(self, recorder: 'ChatRecorder'):
+        self.recorder = recorder
+
+    async def intercept(self, call: ToolCall, call_next: CallNext) -> ToolResult:
+        """Record or replay a single tool call."""
+        run = current_run.get()
+        if run is None or self.recorder.mode == "off":
+            return await call_next(call)
+
+        if self.recorder.mode == "replay":
+            return await self._replay(run, call)
+
+        started_at = time.perf_counter()
+        entry: Dict[str, Any] = {"name": call.name, "arguments": dict(call.arguments)}
+        try:
+            result = await call_next(call)
+            entry["result"] = result_text(result)
+            return result
+        except Exception as e:
+            entry["error"] = str(e)
+            raise
+        finally:
+            entry["duration_ms"] = (time.perf_counter() - started_at) * 1000
+            run.tool_calls.append(entry)
+
+    async def _replay(self, run: ExchangeRun, call: ToolCall) -> ToolResult:
+        """Serve a recorded tool result with its scaled latency."""
+        entry = run.match_tool_call(call.name, call.arguments)
+        run.tool_calls.append({"name": call.name, "arguments": dict(call.arguments)})
+        if entry is None:
+            run.extra_tool_calls += 1
+            return text_result(f"[replay] no recorded result for {call.name}")
+
+        if self.recorder.time_scale > 0 and entry.get("duration_ms"):
+            await asyncio.sleep(entry["duration_ms"] / 1000 * self.recorder.time_scale)
+
+        if "error" in entry:
+            raise ToolException(entry["error"])
+        return text_result(entry.get("result", ""))
+
+
+class ChatRecorder:
+    """Owns cassette files and the record/replay mode for chat requests."""
+
+    def __init__(self, mode: str = "off", cassette_dir: str = "cassettes", time_scale: float = 1.0):
+        if mode not in RECORD_MODES:
+            raise ValueError(f"Invalid record mode '{mode}' (expected one of {sorted(RECORD_MODES)})")
+
+        self.mode = mode
+        self.cassette_dir = Path(cassette_dir)
+        self.time_scale = time_scale
+        self._paths: Dict[str, Path] = {}  # session key -> cassette being recorded
+        self._write_lock = threading.Lock()
+        self._replay: Optional[Dict[str, Any]] = None
+        self._replay_cursor = 0
+        self.completed_runs: List[ExchangeRun] = []  # Replay results, in order
+        logger.info(f"ChatRecorder initialized (mode: {mode})")
+
+    @property
+    def is_recording(self) -> bool:
+        return self.mode == "record"
+
+    @property
+    def is_replaying(self) -> bool:
+        return self.mode == "replay"
+
+    def load_cassette(self, path: str, time_scale: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Switch to replay mode using a cassette file.
+
+        Args:
+            path: Cassette JSONL file (one record per line), or a single JSON document
+            time_scale: Multiplier for recorded latencies (0 disables delays)
+
+        Returns:
+            The loaded cassette
+        """
+        with open(path, encoding="utf-8") as f:
+            if path.endswith(".json"):
+                self._replay = json.load(f)
+            else:
+                self._replay = {"tools": [], "exchanges": []}
+                for line in f:
+                    if not line.strip():
+                        continue
+                    record = json.loads(line)
+                    record_type = record.pop("type", None)
+                    if record_type == "exchange":
+                        self._replay["exchanges"].append(record)
+                    else:
+                        self._replay.update(record)  # "session" header or latest "tools"
+        self._replay_cursor = 0
+        self.completed_runs = []
+        self.mode = "replay"
+        if time_scale is not None:
+            self.time_scale = time_scale
+        logger.info(f"Loaded cassette {path} with {len(self._replay.get('exchanges', []))} exchanges")
+        return self._replay
+
+    async def record_tools(self, key: str, tools: List[BaseTool]) -> None:
+        """Record the tool schemas a session's agent was built with."""
+        if not self.is_recording:
+            return
+        await self._append(key, {
+            "type": "tools",
+            "tools": [
+                {"name": tool.name, "description": tool.description, "args_schema": tool.args_schema}
+                for tool in tools if isinstance(tool.args_schema, dict)
+            ],
+        })
+
+    def replay_tools(self) -> List[BaseTool]:
+        """Build stand-in tools from the cassette's recorded schemas."""
+        async def unavailable(**arguments: Any) -> ToolResult:
+            raise ToolException("Tool is not available in replay mode")
+
+        return [
+            StructuredTool(
+                name=tool["name"],
+                description=tool.get("description", ""),
+                args_schema=tool["args_schema"],
+                coroutine=unavailable,
+                response_format="content_and_artifact",
+            )
+            for tool in (self._replay or {}).get("tools", [])
+        ]
+
+    def start_exchange(self, user_id: Optional[str], message: str) -> Optional[ExchangeRun]:
+        """
+        Begin capturing one chat request.
+
+        Args:
+            user_id: Authenticated user ID (if any)
+            message: User message
+
+        Returns:
+            The run to set as current_run, or None when the recorder is off
+        """
+        if self.mode == "off":
+            return None
+
+        run = ExchangeRun(message=message, user_id=user_id)
+        if self.is_replaying:
+            exchanges = (self._replay or {}).get("exchanges", [])
+            if self._replay_cursor < len(exchanges):
+                run.source = exchanges[self._replay_cursor]
+            self._replay_cursor += 1
+        return run
+
+    def callbacks(self, run: Optional[ExchangeRun]) -> List[AsyncCallbackHandler]:
+        """Callback handlers to pass to the agent for this run."""
+        return [RecordingCallbackHandler(run)] if run and self.is_recording else []
+
+    async def finish_exchange(self, run: Optional[ExchangeRun], key: str, response: str) -> None:
+        """
+        Complete a run: append it to the session cassette, or keep it for replay reports.
+
+        Args:
+            run: Run returned by start_exchange
+            key: Session key the exchange belongs to
+            response: Final assistant response
+        """
+        if run is None:
+            return
+
+        run.duration_ms = (time.perf_counter() - run.started_at) * 1000
+        run.response = response
+
+        if self.is_replaying:
+            self.completed_runs.append(run)
+            return
+
+        await self._append(key, {
+            "type": "exchange",
+            "message": run.message,
+            "response": response,
+            "duration_ms": run.duration_ms,
+            "llm_calls": run.llm_calls,
+            "tool_calls": run.tool_calls,
+        })
+
+    async def _append(self, key: str, record: Dict[str, Any]) -> None:
+        """Append a record to a session cassette without blocking the event loop."""
+        line = json.dumps(record, default=str) + "\n"
+        await asyncio.to_thread(self._write_line, key, line)
+
+    def _write_line(self, key: str, line: str) -> None:
+        """Append a line to a session cassette, starting the file with a session header."""
+        try:
+            with self._write_lock:
+                if key not in self._paths:
+                    safe_key = re.sub(r"[^A-Za-z0-9_-]", "_", key)
+                    self.cassette_dir.mkdir(parents=True, exist_ok=True)
+                    self._paths[key] = self.cassette_dir / f"{safe_key}-{datetime.now():%Y%m%d-%H%M%S}.jsonl"
+                    header = {"type": "session", "session": key, "recorded_at": datetime.now().isoformat()}
+                    line = json.dumps(header) + "\n" + line
+                with open(self._paths[key], "a", encoding="utf-8") as f:
+                    f.write(line)
+        except OSError as e:
+            logger.error(f"Failed to write cassette for {key}: {e}")
+
+
+# Global chat recorder instance
+chat_recorder = ChatRecorder(
+    mode=settings.record_mode,
+    cassette_dir=settings.cassette_dir,
+    time_scale=settings.replay_time_scale
+)
@@ -0,0 +1,227 @@
+"""Load balancing across MCP server replicas with passive health checks."""
+import threading
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, List, Optional
+from langchain_core.tools import ToolException
+from loguru import logger
+from mcp.shared.exceptions import McpError
+from mcp.types import CONNECTION_CLOSED
+from app.config import settings
+
+
+# Routing policies
+LEAST_OUTSTANDING = "least_outstanding"
+LOWEST_LATENCY = "lowest_latency"
+
+# McpError codes raised by the client itself (no response from the replica)
+_TRANSPORT_ERROR_CODES = {408, CONNECTION_CLOSED}  # Request timeout, connection closed
+
+
+def is_replica_failure(error: BaseException) -> bool:
+    """
+    Tell replica failures apart from errors the replica answered with.
+
+    Tool errors and JSON-RPC error responses (e.g. unknown tool, session
+    terminated) mean the replica is up and must not count toward ejection.
+
+    Args:
+        error: Exception raised by a call to a replica
+
+    Returns:
+        True if the replica did not answer (timeout, connection error)
+    """
+    if isinstance(error, ToolException):
+        return False
+    if isinstance(error, McpError):
+        return error.error.code in _TRANSPORT_ERROR_CODES
+    return True
+
+
+@dataclass
+class Replica:
+    """Health and load of one MCP server replica, as observed from real traffic."""
+    url: str
+    outstanding: int = 0
+    latency_ms: Optional[float] = None  # EWMA of successful call latency
+    consecutive_failures: int = 0
+    ejected_until: float = 0.0
+    requests: int = 0
+    failures: int = 0
+    ejections: int = 0
+
+    @property
+    def is_ejected(self) -> bool:
+        """True while the replica is sitting out an ejection period."""
+        return time.monotonic() < self.ejected_until
+
+
+class ReplicaRouter:
+    """
+    Picks the MCP replica for new sessions and logins.
+
+    There is no active probing: every call made through track() updates the
+    replica's outstanding count, latency EWMA and consecutive failure count.
+    A replica that fails eject_after_failures times in a row is ejected for
+    eject_seconds, unless it is the last healthy one.
+
+    The Node.js server keeps API keys and MCP sessions in memory, so a replica
+    is only chosen when a user logs in or a session is opened; callers pin the
+    user to that replica afterwards.
+    """
+
+    def __init__(
+        self,
+        urls: List[str],
+        policy: str = LEAST_OUTSTANDING,
+        eject_after_failures: int = 3,
+        eject_seconds: float = 30.0,
+        latency_alpha: float = 0.3
+    ):
+        if not urls:
+            raise ValueError("At least one MCP server URL is required")
+        if policy not in (LEAST_OUTSTANDING, LOWEST_LATENCY):
+            raise ValueError(f"Unknown replica routing policy: {policy}")
+
+        self.policy = policy
+        self.eject_after_failures = eject_after_failures
+        self.eject_seconds = eject_seconds
+        self.latency_alpha = latency_alpha
+        self._replicas: Dict[str, Replica] = {url: Replica(url=url) for url in urls}
+        self._lock = threading.RLock()
+        logger.info(f"ReplicaRouter initialized with {len(self._replicas)} MCP replicas ({policy})")
+
+    @property
+    def urls(self) -> List[str]:
+        """All configured replica URLs."""
+        return list(self._replicas)
+
+    def choose(self) -> str:
+        """
+        Pick the best replica for a new login or session.
+
+        Returns:
+            Replica base URL (ejected replicas are only used if all are ejected)
+        """
+        with self._lock:
+            replicas = list(self._replicas.values())
+            healthy = [replica for replica in replicas if not replica.is_ejected]
+            if not healthy:
+                # Everything is ejected - try the one that comes back first
+                return min(replicas, key=lambda replica: replica.ejected_until).url
+            return min(healthy, key=self._score).url
+
+    @asynccontextmanager
+    async def track(self, url: str) -> AsyncIterator[None]:
+        """
+        Track a call to a replica (outstanding count, latency and outcome).
+
+        Errors the replica answered with (see is_replica_failure) count as a
+        success; cancellations are not counted either way.
+
+        Args:
+            url: Replica base URL
+        """
+        replica = self._replicas.get(url)
+        if replica is None:
+            yield
+            return
+
+        with self._lock:
+            replica.outstanding += 1
+            replica.requests += 1
+        started = time.perf_counter()
+        try:
+            yield
+        except Exception as e:
+            if is_replica_failure(e):
+                self.record_failure(url)
+            else:
+                self.record_success(url, (time.perf_counter() - started) * 1000)
+            raise
+        else:
+            self.record_success(url, (time.perf_counter() - started) * 1000)
+        finally:
+            with self._lock:
+                replica.outstanding -= 1
+
+    def record_success(self, url: str, latency_ms: Optional[float] = None) -> None:
+        """
+        Record a successful call to a replica.
+
+        Args:
+            url: Replica base URL
+            latency_ms: Observed latency, folded into the EWMA
+        """
+        with self._lock:
+            replica = self._replicas.get(url)
+            if replica is None:
+                return
+
+            replica.consecutive_failures = 0
+            if latency_ms is not None:
+                if replica.latency_ms is None:
+                    replica.latency_ms = latency_ms
+                else:
+                    replica.latency_ms += self.latency_alpha * (latency_ms - replica.latency_ms)
+
+    def record_failure(self, url: str) -> None:
+        """
+        Record a failed call, ejecting the replica after too many in a row.
+
+        Args:
+            url: Replica base URL
+        """
+        with self._lock:
+            replica = self._replicas.get(url)
+            if replica is None:
+                return
+
+            replica.failures += 1
+            replica.consecutive_failures += 1
+            if replica.is_ejected or replica.consecutive_failures < self.eject_after_failures:
+                return
+
+            healthy = [other for other in self._replicas.values() if not other.is_ejected]
+            if len(healthy) <= 1:
+                logger.warning(f"MCP replica {url} is failing but is the last healthy one - not ejecting")
+                return
+
+            replica.ejected_until = time.monotonic() + self.eject_seconds
+            replica.consecutive_failures = 0
+            replica.ejections += 1
+            logger.warning(f"Ejected MCP replica {url} for {self.eject_seconds:.0f}s after repeated failures")
+
+    def get_stats(self) -> List[Dict[str, Any]]:
+        """Get per-replica load and health for status endpoints."""
+        with self._lock:
+            return [
+                {
+                    "url": replica.url,
+                    "healthy": not replica.is_ejected,
+                    "outstanding": replica.outstanding,
+                    "latency_ms": round(replica.latency_ms, 1) if replica.latency_ms is not None else None,
+                    "requests": replica.requests,
+                    "failures": replica.failures,
+                    "ejections": replica.ejections,
+                }
+                for replica in self._replicas.values()
+            ]
+
+    def _score(self, replica: Replica) -> tuple:
+        """Sort key for healthy replicas under the configured policy (lower is better)."""
+        # Replicas without a latency sample yet are tried first so they get one
+        latency = replica.latency_ms if replica.latency_ms is not None else 0.0
+        if self.policy == LOWEST_LATENCY:
+            return (latency * (replica.outstanding + 1), replica.outstanding)
+        return (replica.outstanding, latency)
+
+
+# Global replica router instance
+replica_router = ReplicaRouter(
+    settings.mcp_replica_urls,
+    policy=settings.mcp_replica_policy,
+    eject_after_failures=settings.mcp_replica_eject_failures,
+    eject_seconds=settings.mcp_replica_eject_seconds
+)
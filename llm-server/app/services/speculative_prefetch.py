@@ -0,0 +1,177 @@
+"""Speculative prefetch of read-only tool results while the first LLM call is in flight."""
+import asyncio
+import re
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+from langchain_core.tools import ToolException
+from loguru import logger
+from app.services.agent_budget import argument_tokens
+from app.services.cart_context import cart_context_manager
+from app.services.catalog_service import catalog_service
+from app.services.tool_pipeline import READ_ONLY_TOOLS, CallNext, ToolCall, ToolInterceptor, ToolResult
+
+
+# Message wording that almost always leads to a get_cart call
+_CART_PATTERN = re.compile(r"\b(cart|basket|checkout)\b", re.IGNORECASE)
+
+# Product nouns that lead to a search_products call with the noun as query
+PRODUCT_NOUNS = {
+    "backpack", "bag", "bracelet", "coat", "computer", "dress", "drive", "earring",
+    "hoodie", "jacket", "jewelry", "laptop", "monitor", "necklace", "pant", "phone",
+    "ring", "shirt", "shoe", "ssd", "sweater", "tablet", "tshirt", "tv",
+}
+_WORD_PATTERN = re.compile(r"[a-z]+(?:-[a-z]+)?")
+
+DEFAULT_SEARCH_LIMIT = 20  # Limit the MCP server applies when none is given
+
+
+def predict_tool_calls(message: str, user_id: Optional[str]) -> List[ToolCall]:
+    """
+    Guess the read-only tool calls the agent is about to make for a message.
+
+    Calls the pipeline would answer locally anyway (complete cart mirror,
+    loaded catalog) are not predicted.
+
+    Args:
+        message: User message
+        user_id: Authenticated user ID (if any)
+
+    Returns:
+        Tool calls with the arguments the agent's call will have once the cart ID is injected
+    """
+    calls: List[ToolCall] = []
+
+    if user_id and _CART_PATTERN.search(message):
+        cart_id = cart_context_manager.get_cart_id(user_id)
+        if cart_id is not None and cart_context_manager.render_cart(user_id, cart_id) is None:
+            calls.append(ToolCall(name="get_cart", arguments={"cart_id": cart_id}, user_id=user_id))
+
+    if not catalog_service.is_loaded:
+        for word in _WORD_PATTERN.findall(message.lower()):
+            noun = word.replace("-", "")
+            if noun in PRODUCT_NOUNS or (noun.endswith("s") and noun[:-1] in PRODUCT_NOUNS):
+                calls.append(ToolCall(name="search_products", arguments={"query": word}, user_id=user_id))
+                break
+
+    return calls
+
+
+def prefetch_key(call: ToolCall) -> Tuple[Any, ...]:
+    """
+    Key under which a call's result can be reused.
+
+    Search queries are compared by normalised tokens so "jackets" and
+    "Jacket" share a result; other tools by their exact arguments.
+    """
+    if call.name == "search_products":
+        query = ToolCall(name=call.name, arguments={"query": call.arguments.get("query", "")})
+        category = call.arguments.get("category")
+        return (
+            call.name,
+            argument_tokens(query),
+            str(category).lower() if category else None,
+            int(call.arguments.get("limit") or DEFAULT_SEARCH_LIMIT),
+        )
+    return (call.name, tuple(sorted((name, str(value)) for name, value in call.arguments.items())))
+
+
+@dataclass
+class PrefetchEntry:
+    """A speculative call and its running task."""
+    call: ToolCall
+    task: asyncio.Task
+    used: bool = False
+    stale: bool = False  # Superseded by a state change before it was claimed
+
+
+class SpeculativePrefetch:
+    """Per-request cache of speculative tool calls."""
+
+    def __init__(self):
+        self._entries: Dict[Tuple[Any, ...], PrefetchEntry] = {}
+
+    def start(self, call: ToolCall, call_next: CallNext) -> None:
+        """
+        Start a speculative call in the background.
+
+        Args:
+            call: Predicted tool call
+            call_next: Pipeline stage that performs the call
+        """
+        key = prefetch_key(call)
+        if key not in self._entries:
+            logger.debug(f"Prefetching {call.name} with args: {call.arguments}")
+            self._entries[key] = PrefetchEntry(call=call, task=asyncio.create_task(call_next(call)))
+
+    def claim(self, call: ToolCall) -> Optional[asyncio.Task]:
+        """
+        Take the speculative result for a call, if one was started.
+
+        Args:
+            call: Tool call made by the agent
+
+        Returns:
+            The speculative task (each result is handed out once), None on a miss
+        """
+        entry = self._entries.get(prefetch_key(call))
+        if entry is None or entry.used or entry.stale:
+            return None
+        entry.used = True
+        return entry.task
+
+    def invalidate(self) -> None:
+        """Drop unclaimed results after a state change (they may predate it, e.g. a cart before add_to_cart)."""
+        for entry in self._entries.values():
+            if not entry.used and not entry.stale:
+                entry.stale = True
+                entry.task.cancel()
+
+    def finish(self) -> Dict[str, int]:
+        """
+        Cancel speculative calls that are still running and count the outcome.
+
+        Returns:
+            Counters: started, hits, unused and unused per tool
+        """
+        counts: Dict[str, int] = {}
+        for entry in self._entries.values():
+            outcome = "hits" if entry.used else "unused"
+            counts[outcome] = counts.get(outcome, 0) + 1
+            if not entry.used:
+                counts[f"unused_{entry.call.name}"] = counts.get(f"unused_{entry.call.name}", 0) + 1
+                if not entry.task.done():
+                    entry.task.cancel()
+                elif not entry.task.cancelled():
+                    entry.task.exception()  # Retrieve errors so they are not reported as unhandled
+        if self._entries:
+            counts["started"] = len(self._entries)
+        return counts
+
+
+# Speculative calls of the chat request currently being processed
+current_prefetch: ContextVar[Optional[SpeculativePrefetch]] = ContextVar("current_prefetch", default=None)
+
+
+class SpeculativePrefetchInterceptor(ToolInterceptor):
+    """Serves agent tool calls from results prefetched for the current request."""
+
+    async def intercept(self, call: ToolCall, call_next: CallNext) -> ToolResult:
+        """Await the matching speculative call instead of making a new one."""
+        prefetch = current_prefetch.get()
+        if prefetch and call.name not in READ_ONLY_TOOLS:
+            prefetch.invalidate()
+        task = prefetch.claim(call) if prefetch else None
+        if task is None:
+            return await call_next(call)
+
+        try:
+            result = await task
+        except ToolException:
+            raise
+        except Exception as e:
+            logger.debug(f"Speculative {call.name} failed ({e}) - calling again")
+            return await call_next(call)
+
+        logger.debug(f"Served {call.name} from speculative prefetch")
+        return result
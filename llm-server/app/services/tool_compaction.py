@@ -0,0 +1,168 @@
+"""Compaction of MCP tool results before they are fed back to the LLM."""
+import re
+from typing import Any, Dict, List, Optional, Union
+from langchain_core.messages import BaseMessage, ToolMessage
+from loguru import logger
+from app.services.tool_pipeline import CallNext, ToolCall, ToolInterceptor, ToolResult, result_text
+
+
+# Fields kept per tool when no projection is configured
+DEFAULT_FIELDS: Dict[str, List[str]] = {
+    "search_products": ["title", "price", "category", "rating", "description"],
+    "get_cart": ["quantity", "title", "price", "subtotal"],
+}
+
+# Patterns matching the text returned by the Node.js MCP server ToolHandlers
+_SEARCH_HEADER_PATTERN = re.compile(r"^Found \d+ products? matching .*:$", re.MULTILINE)
+_SEARCH_ITEM_PATTERN = re.compile(
+    r"^\d+\. (?P<title>.+) - \$(?P<price>\S+)\n"
+    r"\s+Category: (?P<category>.+)\n"
+    r"\s+Rating: (?P<rate>\S+)/5 \((?P<count>\S+) reviews\)\n"
+    r"\s+Description: (?P<description>.*)$",
+    re.MULTILINE
+)
+_CART_HEADER_PATTERN = re.compile(r"^🛒 Your Cart \(ID: \d+\)$", re.MULTILINE)
+_CART_ITEM_PATTERN = re.compile(
+    r"^(?P<quantity>\d+)x (?P<title>.+)\n"
+    r"\s+Price: \$(?P<price>\S+) each\n"
+    r"\s+Subtotal: \$(?P<subtotal>\S+)$",
+    re.MULTILINE
+)
+_CART_LINE_PATTERN = re.compile(r"^\d+x .+$", re.MULTILINE)  # First line of any cart item, parsed or not
+_CART_TOTALS_PATTERN = re.compile(r"Total Items: (\d+)\n\s+Total Price: \$(\S+)")
+_CATEGORIES_HEADER = "📂 Available Categories:"
+
+# How each field is rendered in the compact one-line-per-item encoding
+_FIELD_FORMATS = {
+    "price": "${}",
+    "subtotal": "subtotal ${}",
+    "quantity": "{}x",
+}
+
+
+class ToolResultCompactor(ToolInterceptor):
+    """
+    Shrinks tool results to the fields the LLM needs.
+
+    The compact text becomes the ToolMessage content sent to the model; the
+    original text is kept in the ToolMessage artifact ("full_text"), which is
+    never sent to the LLM during the agent loop but is restored by
+    expand_tool_results() for the final best-effort answer.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = True,
+        max_items: int = 8,
+        description_chars: int = 80,
+        max_chars: int = 2000,
+        fields: Optional[Dict[str, List[str]]] = None
+    ):
+        self.enabled = enabled
+        self.max_items = max_items
+        self.description_chars = description_chars
+        self.max_chars = max_chars
+        self.fields = {**DEFAULT_FIELDS, **(fields or {})}
+
+    async def intercept(self, call: ToolCall, call_next: CallNext) -> ToolResult:
+        """Compact the result of the downstream call."""
+        result = await call_next(call)
+        if not self.enabled:
+            return result
+
+        full_text = result_text(result)
+        compact_text = self.compact(call.name, full_text)
+        if compact_text == full_text:
+            return result
+
+        logger.debug(f"Compacted {call.name} result from {len(full_text)} to {len(compact_text)} chars")
+        artifact = result[1] if isinstance(result, tuple) else None
+        return compact_text, {"full_text": full_text, "artifact": artifact}
+
+    def compact(self, tool_name: str, text: str) -> str:
+        """
+        Compact the text of a tool result.
+
+        Args:
+            tool_name: Tool that produced the text
+            text: Text as returned by the MCP server
+
+        Returns:
+            Compact text (unchanged if the format is not recognised)
+        """
+        compact = text
+        search_header = _SEARCH_HEADER_PATTERN.search(text)
+        cart_header = _CART_HEADER_PATTERN.search(text)
+
+        if tool_name == "search_products" and search_header:
+            items = [self._search_item(match.groupdict()) for match in _SEARCH_ITEM_PATTERN.finditer(text)]
+            compact = self._encode(search_header.group(0), items, self.fields["search_products"])
+        elif tool_name == "get_cart" and cart_header:
+            items = self._cart_items(text)
+            compact = self._encode(cart_header.group(0), items, self.fields["get_cart"])
+            totals = _CART_TOTALS_PATTERN.search(text)
+            if totals:
+                compact += f"\nTotal: {totals.group(1)} items, ${totals.group(2)}"
+        elif tool_name == "get_categories" and text.startswith(_CATEGORIES_HEADER):
+            categories = [line.lstrip("• ").strip() for line in text.splitlines()[1:] if line.strip()]
+            compact = "Categories: " + ", ".join(categories)
+
+        if self.max_chars and len(compact) > self.max_chars:
+            compact = compact[:self.max_chars] + "…"
+        return compact
+
+    def _search_item(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        """Normalise a parsed search result (rating, truncated description)."""
+        description = item["description"].rstrip(".").strip()
+        if self.description_chars <= 0:
+            description = ""
+        elif len(description) > self.description_chars:
+            description = description[:self.description_chars].rstrip() + "…"
+
+        return {
+            **item,
+            "rating": f"{item['rate']}★ ({item['count']})",
+            "description": description,
+        }
+
+    def _cart_items(self, text: str) -> List[Union[Dict[str, Any], str]]:
+        """Parse cart items, keeping lines that do not match the item format (e.g. "Unknown Product") verbatim."""
+        parsed = {match.start(): match.groupdict() for match in _CART_ITEM_PATTERN.finditer(text)}
+        return [parsed.get(line.start(), line.group(0)) for line in _CART_LINE_PATTERN.finditer(text)]
+
+    def _encode(self, header: str, items: List[Union[Dict[str, Any], str]], fields: List[str]) -> str:
+        """Encode items one per line with the projected fields, capped at max_items (raw lines are kept as is)."""
+        shown = items[:self.max_items] if self.max_items > 0 else items
+        lines = [header]
+        for item in shown:
+            if isinstance(item, str):
+                lines.append(item)
+                continue
+            values = [
+                _FIELD_FORMATS.get(name, "{}").format(item[name])
+                for name in fields if item.get(name)
+            ]
+            lines.append(" | ".join(values))
+
+        if len(shown) < len(items):
+            lines.append(f"(+{len(items) - len(shown)} more not shown - refine the search to see them)")
+        return "\n".join(lines)
+
+
+def expand_tool_results(messages: List[BaseMessage]) -> List[BaseMessage]:
+    """
+    Replace compacted tool message contents with the full text kept in their artifacts.
+
+    Args:
+        messages: Conversation messages
+
+    Returns:
+        Messages with compacted ToolMessages expanded (other messages unchanged)
+    """
+    expanded: List[BaseMessage] = []
+    for message in messages:
+        artifact = message.artifact if isinstance(message, ToolMessage) else None
+        if isinstance(artifact, dict) and "full_text" in artifact:
+            message = message.model_copy(update={"content": artifact["full_text"]})
+        expanded.append(message)
+    return expanded
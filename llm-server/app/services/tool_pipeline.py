@@ -0,0 +1,140 @@
+"""Tool pipeline for intercepting MCP tool calls made by the LLM agent."""
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from langchain_core.tools import BaseTool, StructuredTool
+from loguru import logger
+
+
+# (content, artifact) tuple as produced by langchain-mcp-adapters tools
+ToolResult = Tuple[Any, Any]
+
+# Tools that never change server-side state (safe to retry, cache or serve locally)
+READ_ONLY_TOOLS = {"search_products", "get_cart", "get_categories"}
+
+# User owning the chat request currently being processed (set by LLMService.chat)
+current_user_id: ContextVar[Optional[str]] = ContextVar("current_user_id", default=None)
+
+
+@dataclass
+class ToolCall:
+    """A single tool invocation flowing through the pipeline."""
+    name: str
+    arguments: Dict[str, Any]
+    user_id: Optional[str] = None
+
+
+CallNext = Callable[[ToolCall], Awaitable[ToolResult]]
+
+
+def result_text(result: ToolResult) -> str:
+    """Extract the text content from a tool result."""
+    content = result[0] if isinstance(result, tuple) else result
+    if isinstance(content, list):
+        return "\n".join(str(item) for item in content)
+    return str(content)
+
+
+def text_result(text: str) -> ToolResult:
+    """Build a tool result from plain text (no artifact)."""
+    return text, None
+
+
+class ToolInterceptor:
+    """Base class for tool interceptors. Subclasses override what they need."""
+
+    def adjust_schema(self, tool_name: str, schema: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Adjust the JSON input schema exposed to the LLM for a tool.
+
+        Args:
+            tool_name: Name of the MCP tool
+            schema: JSON schema (already copied, safe to mutate)
+
+        Returns:
+            The schema to expose
+        """
+        return schema
+
+    async def intercept(self, call: ToolCall, call_next: CallNext) -> ToolResult:
+        """
+        Handle a tool call, delegating to the next stage when needed.
+
+        Args:
+            call: Tool call being processed
+            call_next: Next stage of the pipeline (eventually the MCP server)
+
+        Returns:
+            Tool result
+        """
+        return await call_next(call)
+
+
+class ToolPipeline:
+    """Wraps MCP tools so every call flows through a chain of interceptors."""
+
+    def __init__(self, interceptors: Optional[List[ToolInterceptor]] = None):
+        self.interceptors: List[ToolInterceptor] = list(interceptors or [])
+
+    def wrap_tools(self, tools: List[BaseTool]) -> List[BaseTool]:
+        """Wrap a list of MCP tools."""
+        return [self.wrap_tool(tool) for tool in tools]
+
+    def wrap_tool(self, tool: BaseTool) -> BaseTool:
+        """
+        Wrap a single MCP tool with the interceptor chain.
+
+        Args:
+            tool: Tool returned by MultiServerMCPClient.get_tools()
+
+        Returns:
+            New StructuredTool exposing the (possibly adjusted) schema
+        """
+        schema = tool.args_schema
+        if isinstance(schema, dict):
+            schema = dict(schema)
+            for interceptor in self.interceptors:
+                schema = interceptor.adjust_schema(tool.name, schema)
+
+        async def call_upstream(call: ToolCall) -> ToolResult:
+            return await tool.coroutine(**call.arguments)
+
+        async def call_tool(**arguments: Any) -> ToolResult:
+            call = ToolCall(name=tool.name, arguments=dict(arguments), user_id=current_user_id.get())
+            return await self._dispatch(call, 0, call_upstream)
+
+        return StructuredTool(
+            name=tool.name,
+            description=tool.description,
+            args_schema=schema,
+            coroutine=call_tool,
+            response_format=getattr(tool, "response_format", "content_and_artifact"),
+            metadata=tool.metadata,
+        )
+
+    async def call_after(self, interceptor: ToolInterceptor, call: ToolCall, call_upstream: CallNext) -> ToolResult:
+        """
+        Run a call through the stages after an interceptor (for calls made outside the agent).
+
+        Args:
+            interceptor: Interceptor in this pipeline; only later stages run
+            call: Tool call to make
+            call_upstream: Final stage that calls the MCP server
+
+        Returns:
+            Tool result
+        """
+        return await self._dispatch(call, self.interceptors.index(interceptor) + 1, call_upstream)
+
+    async def _dispatch(self, call: ToolCall, index: int, call_upstream: CallNext) -> ToolResult:
+        """Run interceptor at index, chaining to the next one."""
+        if index >= len(self.interceptors):
+            logger.debug(f"Calling MCP tool {call.name} with args: {call.arguments}")
+            return await call_upstream(call)
+
+        interceptor = self.interceptors[index]
+
+        async def call_next(next_call: ToolCall) -> ToolResult:
+            return await self._dispatch(next_call, index + 1, call_upstream)
+
+        return await interceptor.intercept(call, call_next)
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""Replay a recorded cassette through LLMService and report LLM turn, tool call and latency changes."""
+import argparse
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+
+async def replay(cassette_path: str, time_scale: float, latency_tolerance: float) -> int:
+    """Replay every exchange of a cassette and compare it with the recording."""
+    from app.services.llm_service import llm_service
+    from app.services.recorder import chat_recorder
+
+    cassette = chat_recorder.load_cassette(cassette_path, time_scale=time_scale)
+    session = cassette.get("session")
+    user_id = None if session in (None, "system") else session
+
+    await llm_service.initialize(user_id=user_id)
+    for exchange in cassette.get("exchanges", []):
+        await llm_service.chat(exchange["message"], user_id=user_id)
+
+    regressions = 0
+    print(f"{'#':>3}  {'LLM':>9}  {'Tools':>9}  {'Latency ms (scaled)':>24}  Message")
+    for index, (exchange, run) in enumerate(zip(cassette.get("exchanges", []), chat_recorder.completed_runs), start=1):
+        summary = run.summary()
+        recorded_llm = len(exchange.get("llm_calls", []))
+        recorded_tools = len(exchange.get("tool_calls", []))
+        expected_ms = exchange.get("duration_ms", 0.0) * time_scale
+
+        flags = []
+        if summary["llm_calls"] > recorded_llm or summary["extra_llm_calls"]:
+            flags.append("more LLM turns")
+        if summary["tool_calls"] > recorded_tools or summary["extra_tool_calls"]:
+            flags.append("more tool calls")
+        if time_scale > 0 and summary["duration_ms"] > expected_ms * (1 + latency_tolerance):
+            flags.append("slower")
+        regressions += bool(flags)
+
+        print(
+            f"{index:>3}  {recorded_llm:>4}->{summary['llm_calls']:<4}  "
+            f"{recorded_tools:>4}->{summary['tool_calls']:<4}  "
+            f"{expected_ms:>11.0f}->{summary['duration_ms']:<11.0f}  "
+            f"{exchange['message'][:40]}{'  ⚠️ ' + ', '.join(flags) if flags else ''}"
+        )
+
+    await llm_service.close()
+    print(f"\n{regressions} regression(s) in {len(chat_recorder.completed_runs)} exchange(s)")
+    return 1 if regressions else 0
+
+
+def main():
+    """Parse arguments and run the replay."""
+    parser = argparse.ArgumentParser(description="Replay a chat cassette offline")
+    parser.add_argument("cassette", help="Cassette JSONL file recorded with RECORD_MODE=record")
+    parser.add_argument("--time-scale", type=float, default=1.0, help="Latency multiplier (0 disables delays)")
+    parser.add_argument("--latency-tolerance", type=float, default=0.2, help="Allowed relative slowdown (default 20%%)")
+    args = parser.parse_args()
+
+    # Replay needs no real credentials; Settings still requires the key to be set
+    sys.path.insert(0, str(Path(__file__).parent))
+    os.environ.setdefault("OPENAI_API_KEY", "replay")
+    os.environ["RECORD_MODE"] = "off"  # load_cassette() switches the recorder to replay
+
+    return asyncio.run(replay(args.cassette, args.time_scale, args.latency_tolerance))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
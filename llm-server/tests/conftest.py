@@ -0,0 +1,5 @@
+"""Shared test setup."""
+import os
+
+# Settings requires an OpenAI key at import time; tests never call OpenAI
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
@@ -0,0 +1,174 @@
+"""Tests for the cart context mirror against the Node.js MCP server's tool output."""
+import asyncio
+from datetime import datetime, timedelta
+from app.services.cart_context import CartContextInterceptor, CartContextManager
+from app.services.tool_pipeline import ToolCall, text_result
+
+
+USER = "42"
+
+# Text as produced by server/src/mcp/tools.ts
+ADD_NEW_CART = (
+    "✅ Added 2x Mens Casual Premium Slim Fit T-Shirts ($22.3 each) to your cart.\n\n"
+    "Cart ID: 11\nTotal items in cart: 2\nSubtotal for this item: $44.60"
+)
+ADD_EXISTING_CART = (
+    "✅ Added 1x Fjallraven - Foldsack No. 1 Backpack, Fits 15 Laptops ($109.95 each) to your cart.\n\n"
+    "Cart ID: 11\nTotal items in cart: 3\nSubtotal for this item: $109.95"
+)
+REMOVE_PARTIAL = (
+    "✅ Removed 1 Mens Casual Premium Slim Fit T-Shirts from your cart.\n\n"
+    "Remaining in cart: 1x Mens Casual Premium Slim Fit T-Shirts\nTotal items in cart: 2"
+)
+REMOVE_ALL = (
+    "✅ Removed all Fjallraven - Foldsack No. 1 Backpack, Fits 15 Laptops from your cart.\n\n"
+    "Total items in cart: 1"
+)
+GET_CART = (
+    "🛒 Your Cart (ID: 11)\n\n"
+    "2x Mens Casual Premium Slim Fit T-Shirts\n   Price: $22.3 each\n   Subtotal: $44.60\n\n"
+    "1x Fjallraven - Foldsack No. 1 Backpack, Fits 15 Laptops\n   Price: $109.95 each\n   Subtotal: $109.95\n\n"
+    "📊 Cart Summary:\n   Total Items: 3\n   Total Price: $154.55"
+)
+GET_CART_UNKNOWN = (
+    "🛒 Your Cart (ID: 11)\n\n"
+    "2x Mens Casual Premium Slim Fit T-Shirts\n   Price: $22.3 each\n   Subtotal: $44.60\n\n"
+    "1x Unknown Product (ID: 99)\n\n"
+    "📊 Cart Summary:\n   Total Items: 3\n   Total Price: $44.60"
+)
+
+
+def quantities(manager: CartContextManager) -> dict:
+    """Mirrored quantities by title."""
+    context = manager._get_context(USER)
+    return {title: item.quantity for title, item in context.items.items()}
+
+
+def test_add_without_cart_id_starts_complete_mirror():
+    manager = CartContextManager()
+    manager.record_tool_result(USER, "add_to_cart", {"product_name": "shirt"}, ADD_NEW_CART)
+
+    assert manager.get_cart_id(USER) == 11
+    assert quantities(manager) == {"Mens Casual Premium Slim Fit T-Shirts": 2}
+    assert manager.render_cart(USER, 11) is not None
+
+
+def test_add_to_known_cart_accumulates_items():
+    manager = CartContextManager()
+    manager.record_tool_result(USER, "add_to_cart", {"product_name": "shirt"}, ADD_NEW_CART)
+    manager.record_tool_result(USER, "add_to_cart", {"product_name": "backpack", "cart_id": 11}, ADD_EXISTING_CART)
+
+    assert quantities(manager) == {
+        "Mens Casual Premium Slim Fit T-Shirts": 2,
+        "Fjallraven - Foldsack No. 1 Backpack, Fits 15 Laptops": 1,
+    }
+    assert manager.render_cart(USER, 11) is not None
+
+
+def test_add_to_unseen_cart_is_incomplete():
+    manager = CartContextManager()
+    manager.record_tool_result(USER, "add_to_cart", {"product_name": "backpack", "cart_id": 11}, ADD_EXISTING_CART)
+
+    assert manager.get_cart_id(USER) == 11
+    assert manager.render_cart(USER, 11) is None
+
+
+def test_remove_updates_quantities():
+    manager = CartContextManager()
+    manager.record_tool_result(USER, "get_cart", {"cart_id": 11}, GET_CART)
+    manager.record_tool_result(USER, "remove_from_cart", {"cart_id": 11}, REMOVE_PARTIAL)
+    manager.record_tool_result(USER, "remove_from_cart", {"cart_id": 11}, REMOVE_ALL)
+
+    assert quantities(manager) == {"Mens Casual Premium Slim Fit T-Shirts": 1}
+    assert manager.render_cart(USER, 11) is not None
+
+
+def test_total_mismatch_marks_mirror_incomplete():
+    manager = CartContextManager()
+    manager.record_tool_result(USER, "add_to_cart", {"product_name": "shirt"}, ADD_NEW_CART)
+    manager.record_tool_result(USER, "remove_from_cart", {"cart_id": 11}, REMOVE_ALL)  # Server says 1 item left
+
+    assert manager.render_cart(USER, 11) is None
+
+
+def test_snapshot_replaces_mirror():
+    manager = CartContextManager()
+    manager.record_tool_result(USER, "get_cart", {"cart_id": 11}, GET_CART)
+
+    assert manager.get_cart_id(USER) == 11
+    assert quantities(manager) == {
+        "Mens Casual Premium Slim Fit T-Shirts": 2,
+        "Fjallraven - Foldsack No. 1 Backpack, Fits 15 Laptops": 1,
+    }
+
+
+def test_snapshot_with_unknown_product_is_incomplete():
+    manager = CartContextManager()
+    manager.record_tool_result(USER, "get_cart", {"cart_id": 11}, GET_CART_UNKNOWN)
+
+    assert manager.render_cart(USER, 11) is None
+
+
+def test_empty_cart_snapshot():
+    manager = CartContextManager()
+    manager.record_tool_result(USER, "get_cart", {"cart_id": 11}, "🛒 Cart 11 is empty")
+
+    assert manager.render_cart(USER, 11) == "🛒 Cart 11 is empty"
+
+
+def test_render_round_trips_through_snapshot_parser():
+    manager = CartContextManager()
+    manager.record_tool_result(USER, "get_cart", {"cart_id": 11}, GET_CART)
+    rendered = manager.render_cart(USER, 11)
+
+    assert rendered == GET_CART
+
+    other = CartContextManager()
+    other.record_tool_result(USER, "get_cart", {"cart_id": 11}, rendered)
+    assert quantities(other) == quantities(manager)
+
+
+def test_render_refuses_other_cart():
+    manager = CartContextManager()
+    manager.record_tool_result(USER, "get_cart", {"cart_id": 11}, GET_CART)
+
+    assert manager.render_cart(USER, 12) is None
+
+
+def test_cleanup_expired_removes_stale_contexts():
+    manager = CartContextManager(expires_hours=1)
+    manager.record_tool_result(USER, "get_cart", {"cart_id": 11}, GET_CART)
+    manager.record_tool_result("7", "get_cart", {"cart_id": 12}, GET_CART.replace("ID: 11", "ID: 12"))
+    manager._contexts[USER].updated_at = datetime.now() - timedelta(hours=2)
+
+    assert manager.cleanup_expired() == 1
+    assert manager.get_cart_id(USER) is None
+    assert manager.get_cart_id("7") == 12
+
+
+def test_interceptor_injects_cart_id_and_serves_mirror():
+    manager = CartContextManager()
+    manager.record_tool_result(USER, "add_to_cart", {"product_name": "shirt"}, ADD_NEW_CART)
+    interceptor = CartContextInterceptor(manager)
+    upstream_calls = []
+
+    async def call_next(call: ToolCall):
+        upstream_calls.append(call)
+        return text_result(ADD_EXISTING_CART)
+
+    result = asyncio.run(interceptor.intercept(ToolCall("get_cart", {}, USER), call_next))
+    assert result[0].startswith("🛒 Your Cart (ID: 11)")
+    assert upstream_calls == []
+
+    asyncio.run(interceptor.intercept(ToolCall("add_to_cart", {"product_name": "backpack"}, USER), call_next))
+    assert upstream_calls[0].arguments["cart_id"] == 11
+
+
+def test_interceptor_without_active_cart_answers_locally():
+    interceptor = CartContextInterceptor(CartContextManager())
+
+    async def call_next(call: ToolCall):
+        raise AssertionError("should not reach the MCP server")
+
+    result = asyncio.run(interceptor.intercept(ToolCall("get_cart", {}, USER), call_next))
+    assert "don't have an active cart" in result[0]
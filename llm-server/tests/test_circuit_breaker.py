@@ -0,0 +1,184 @@
+"""Tests for the circuit breaker state machine and the MCP tool interceptor."""
+import asyncio
+import pytest
+from langchain_core.tools import ToolException
+from app.services import circuit_breaker as circuit_breaker_module
+from app.services.circuit_breaker import (
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    CircuitBreaker,
+    CircuitBreakerInterceptor,
+    CircuitOpenError,
+)
+from app.services.tool_pipeline import ToolCall, text_result
+
+
+class FakeClock:
+    """Stand-in for time.monotonic that only moves when told to."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch) -> FakeClock:
+    fake = FakeClock()
+    monkeypatch.setattr(circuit_breaker_module.time, "monotonic", fake)
+    return fake
+
+
+def open_breaker(clock: FakeClock) -> CircuitBreaker:
+    """A breaker that has just opened after min_calls failures."""
+    breaker = CircuitBreaker("test", failure_rate=0.5, min_calls=4, window_seconds=60, open_seconds=30)
+    for _ in range(4):
+        breaker.record_failure()
+    assert breaker.state == OPEN
+    return breaker
+
+
+def test_opens_once_failure_rate_reached_over_min_calls(clock):
+    breaker = CircuitBreaker("test", failure_rate=0.5, min_calls=4)
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == CLOSED  # Too few calls to judge
+
+    breaker.record_success()
+    breaker.record_success()
+    assert breaker.state == CLOSED  # The rate is evaluated when a failure is recorded
+    breaker.record_failure()
+    assert breaker.state == OPEN  # 3/5 failed
+    assert not breaker.allow()
+
+
+def test_old_outcomes_leave_the_window(clock):
+    breaker = CircuitBreaker("test", failure_rate=0.5, min_calls=4, window_seconds=60)
+    for _ in range(3):
+        breaker.record_failure()
+    clock.now += 61
+    breaker.record_failure()
+
+    assert breaker.state == CLOSED
+    assert breaker.get_stats()["calls"] == 1
+
+
+def test_half_open_after_open_period_allows_one_probe(clock):
+    breaker = open_breaker(clock)
+    clock.now += 29
+    assert not breaker.allow()
+    assert breaker.retry_after() == pytest.approx(1)
+
+    clock.now += 1
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow()
+    assert not breaker.allow()
+
+
+def test_successful_probe_closes(clock):
+    breaker = open_breaker(clock)
+    clock.now += 30
+    assert breaker.allow()
+    breaker.record_success()
+
+    assert breaker.state == CLOSED
+    assert breaker.get_stats()["failures"] == 0
+
+
+def test_failed_probe_reopens(clock):
+    breaker = open_breaker(clock)
+    clock.now += 30
+    assert breaker.allow()
+    breaker.record_failure()
+
+    assert breaker.state == OPEN
+    assert breaker.retry_after() == pytest.approx(30)
+
+
+def test_released_probe_frees_its_slot(clock):
+    breaker = open_breaker(clock)
+    clock.now += 30
+    assert breaker.allow()
+    breaker.release_probe()
+
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow()
+
+
+def test_lost_probe_expires_after_open_period(clock):
+    breaker = open_breaker(clock)
+    clock.now += 30
+    assert breaker.allow()
+    clock.now += 29
+    assert not breaker.allow()
+
+    clock.now += 1
+    assert breaker.allow()
+
+
+def test_call_records_outcomes_and_fails_fast(clock):
+    breaker = CircuitBreaker("test", failure_rate=0.5, min_calls=2)
+
+    async def fail():
+        raise ConnectionError("down")
+
+    async def tool_error():
+        raise ToolException("bad arguments")
+
+    with pytest.raises(ToolException):
+        asyncio.run(breaker.call(tool_error, ignore=(ToolException,)))
+    with pytest.raises(ConnectionError):
+        asyncio.run(breaker.call(fail))
+    assert breaker.state == OPEN  # 1 of 2 failed; the tool error counted as a success
+
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(breaker.call(fail))
+
+
+def test_cancelled_probe_is_released(clock):
+    breaker = open_breaker(clock)
+    clock.now += 30
+
+    async def cancelled():
+        raise asyncio.CancelledError()
+
+    with pytest.raises(asyncio.CancelledError):
+        asyncio.run(breaker.call(cancelled))
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow()
+
+
+def test_interceptor_serves_cached_search_while_open(clock):
+    breaker = CircuitBreaker("test", failure_rate=0.5, min_calls=1)
+    interceptor = CircuitBreakerInterceptor(breaker)
+    call = ToolCall("search_products", {"query": "jacket"}, "42")
+
+    async def found(call: ToolCall):
+        return text_result("Found 1 product matching 'jacket':")
+
+    async def down(call: ToolCall):
+        raise ConnectionError("down")
+
+    asyncio.run(interceptor.intercept(call, found))
+    result = asyncio.run(interceptor.intercept(call, down))
+
+    assert result[0].startswith("Found 1 product matching 'jacket':")
+    assert "(Cached result" in result[0]
+    assert breaker.state == OPEN
+
+
+def test_interceptor_never_serves_cached_cart(clock):
+    interceptor = CircuitBreakerInterceptor(CircuitBreaker("test", failure_rate=0.5, min_calls=1))
+    call = ToolCall("get_cart", {"cart_id": 11}, "42")
+
+    async def cart(call: ToolCall):
+        return text_result("🛒 Your Cart (ID: 11)")
+
+    async def down(call: ToolCall):
+        raise ConnectionError("down")
+
+    asyncio.run(interceptor.intercept(call, cart))
+    with pytest.raises(ToolException):
+        asyncio.run(interceptor.intercept(call, down))
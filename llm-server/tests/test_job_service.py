@@ -0,0 +1,65 @@
+"""Tests for chat job cancellation and worker shutdown."""
+import asyncio
+from app.services import job_service
+from app.services.job_service import CANCELLED, COMPLETED, ChatJobManager
+
+
+async def slow_chat(message: str, user_id=None) -> str:
+    await asyncio.sleep(3600)
+    return message
+
+
+async def echo_chat(message: str, user_id=None) -> str:
+    return f"echo: {message}"
+
+
+def test_job_completes(monkeypatch):
+    monkeypatch.setattr(job_service.llm_service, "chat", echo_chat)
+
+    async def run():
+        manager = ChatJobManager(workers=1)
+        job = manager.submit("hi")
+        await manager.wait(job, timeout=1)
+        await manager.close()
+        return job
+
+    job = asyncio.run(run())
+    assert job.status == COMPLETED
+    assert job.result == "echo: hi"
+
+
+def test_cancelled_job_keeps_worker_running(monkeypatch):
+    async def run():
+        manager = ChatJobManager(workers=1)
+        monkeypatch.setattr(job_service.llm_service, "chat", slow_chat)
+        first = manager.submit("slow")
+        await asyncio.sleep(0.01)
+        manager.cancel(first)
+
+        monkeypatch.setattr(job_service.llm_service, "chat", echo_chat)
+        second = manager.submit("next")
+        await manager.wait(second, timeout=1)
+        await asyncio.wait_for(manager.close(), timeout=1)
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert first.status == CANCELLED
+    assert second.status == COMPLETED
+
+
+def test_close_stops_workers_with_running_job(monkeypatch):
+    monkeypatch.setattr(job_service.llm_service, "chat", slow_chat)
+
+    async def run():
+        manager = ChatJobManager(workers=2)
+        running = manager.submit("slow")
+        queued = [manager.submit("slow") for _ in range(2)]
+        await asyncio.sleep(0.01)
+        workers = list(manager._worker_tasks)
+        await asyncio.wait_for(manager.close(), timeout=1)
+        return running, queued, workers
+
+    running, queued, workers = asyncio.run(run())
+    assert all(task.done() for task in workers)
+    assert running.status == CANCELLED
+    assert all(job.status == CANCELLED for job in queued)
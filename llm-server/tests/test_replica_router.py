@@ -0,0 +1,164 @@
+"""Tests for MCP replica selection, passive health tracking and ejection."""
+import asyncio
+import pytest
+from langchain_core.tools import ToolException
+from mcp.shared.exceptions import McpError
+from mcp.types import CONNECTION_CLOSED, ErrorData, METHOD_NOT_FOUND
+from app.services import replica_router as replica_router_module
+from app.services.replica_router import LOWEST_LATENCY, ReplicaRouter, is_replica_failure
+
+
+A = "http://mcp-1:3000"
+B = "http://mcp-2:3000"
+
+
+class FakeClock:
+    """Stand-in for time.monotonic that only moves when told to."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch) -> FakeClock:
+    fake = FakeClock()
+    monkeypatch.setattr(replica_router_module.time, "monotonic", fake)
+    return fake
+
+
+def stats(router: ReplicaRouter) -> dict:
+    """Per-replica stats by URL."""
+    return {replica["url"]: replica for replica in router.get_stats()}
+
+
+def mcp_error(code: int) -> McpError:
+    return McpError(ErrorData(code=code, message="error"))
+
+
+def test_requires_urls_and_known_policy():
+    with pytest.raises(ValueError):
+        ReplicaRouter([])
+    with pytest.raises(ValueError):
+        ReplicaRouter([A], policy="random")
+
+
+def test_least_outstanding_picks_idle_replica():
+    router = ReplicaRouter([A, B])
+
+    async def run():
+        async with router.track(A):
+            return router.choose()
+
+    assert asyncio.run(run()) == B
+    assert stats(router)[A]["outstanding"] == 0
+
+
+def test_lowest_latency_prefers_faster_replica():
+    router = ReplicaRouter([A, B], policy=LOWEST_LATENCY)
+    router.record_success(A, 200.0)
+    router.record_success(B, 50.0)
+
+    assert router.choose() == B
+
+
+def test_replica_without_latency_sample_is_tried_first():
+    router = ReplicaRouter([A, B], policy=LOWEST_LATENCY)
+    router.record_success(A, 10.0)
+
+    assert router.choose() == B
+
+
+def test_latency_is_an_ewma():
+    router = ReplicaRouter([A], latency_alpha=0.5)
+    router.record_success(A, 100.0)
+    router.record_success(A, 200.0)
+
+    assert stats(router)[A]["latency_ms"] == 150.0
+
+
+def test_ejects_after_consecutive_failures(clock):
+    router = ReplicaRouter([A, B], eject_after_failures=3, eject_seconds=30)
+    router.record_failure(A)
+    router.record_failure(A)
+    router.record_success(A)  # Resets the streak
+    router.record_failure(A)
+    router.record_failure(A)
+    assert stats(router)[A]["healthy"]
+
+    router.record_failure(A)
+    assert not stats(router)[A]["healthy"]
+    assert stats(router)[A]["ejections"] == 1
+    assert router.choose() == B
+
+
+def test_ejection_expires(clock):
+    router = ReplicaRouter([A, B], eject_after_failures=1, eject_seconds=30)
+    router.record_failure(A)
+    assert not stats(router)[A]["healthy"]
+
+    clock.now += 30
+    assert stats(router)[A]["healthy"]
+    assert router.choose() == A  # No latency sample yet, fewest outstanding tie broken by order
+
+
+def test_last_healthy_replica_is_never_ejected(clock):
+    router = ReplicaRouter([A, B], eject_after_failures=1)
+    router.record_failure(A)
+    router.record_failure(B)
+
+    assert not stats(router)[A]["healthy"]
+    assert stats(router)[B]["healthy"]
+    assert router.choose() == B
+
+
+def test_single_replica_is_never_ejected(clock):
+    router = ReplicaRouter([A], eject_after_failures=1)
+    for _ in range(5):
+        router.record_failure(A)
+
+    assert stats(router)[A]["healthy"]
+    assert stats(router)[A]["failures"] == 5
+
+
+def test_replica_failures_are_told_apart_from_answers():
+    assert is_replica_failure(ConnectionError("refused"))
+    assert is_replica_failure(mcp_error(408))  # Client-side request timeout
+    assert is_replica_failure(mcp_error(CONNECTION_CLOSED))
+    assert not is_replica_failure(mcp_error(METHOD_NOT_FOUND))
+    assert not is_replica_failure(mcp_error(32600))  # Session terminated (HTTP 404)
+    assert not is_replica_failure(ToolException("Product not found"))
+
+
+@pytest.mark.parametrize("error, counted", [
+    (ToolException("Product not found"), False),
+    (mcp_error(METHOD_NOT_FOUND), False),
+    (mcp_error(408), True),
+    (ConnectionError("refused"), True),
+])
+def test_track_counts_only_replica_failures(clock, error, counted):
+    router = ReplicaRouter([A, B], eject_after_failures=1)
+
+    async def run():
+        async with router.track(A):
+            raise error
+
+    with pytest.raises(type(error)):
+        asyncio.run(run())
+    assert stats(router)[A]["failures"] == (1 if counted else 0)
+    assert stats(router)[A]["healthy"] is not counted
+    assert stats(router)[A]["outstanding"] == 0
+
+
+def test_track_ignores_unknown_replicas():
+    router = ReplicaRouter([A])
+
+    async def run():
+        async with router.track("http://elsewhere:3000"):
+            raise ConnectionError("refused")
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(run())
+    assert stats(router)[A]["requests"] == 0
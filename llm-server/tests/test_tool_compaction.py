@@ -0,0 +1,107 @@
+"""Tests for tool result compaction against the Node.js MCP server's tool output."""
+import asyncio
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from app.services.tool_compaction import ToolResultCompactor, expand_tool_results
+from app.services.tool_pipeline import ToolCall, text_result
+
+
+# Text as produced by server/src/mcp/tools.ts
+SEARCH = (
+    "Found 2 products matching 'jacket':\n\n"
+    "1. Mens Cotton Jacket - $55.99\n"
+    "   Category: men's clothing\n"
+    "   Rating: 4.7/5 (500 reviews)\n"
+    "   Description: great outerwear jackets for Spring/Autumn/Winter, suitable for many occasions, such as working...\n\n"
+    "2. Lock and Love Women's Removable Hooded Faux Leather Moto Biker Jacket - $29.95\n"
+    "   Category: women's clothing\n"
+    "   Rating: 2.9/5 (340 reviews)\n"
+    "   Description: 100% POLYURETHANE(shell) 100% POLYESTER(lining) 75% POLYESTER 25% COTTON (SWEATER)...."
+)
+GET_CART_UNKNOWN = (
+    "🛒 Your Cart (ID: 11)\n\n"
+    "2x Mens Casual Premium Slim Fit T-Shirts\n   Price: $22.3 each\n   Subtotal: $44.60\n\n"
+    "1x Unknown Product (ID: 99)\n\n"
+    "📊 Cart Summary:\n   Total Items: 3\n   Total Price: $44.60"
+)
+CATEGORIES = "📂 Available Categories:\n\n• electronics\n• jewelery\n• men's clothing\n• women's clothing"
+
+
+def test_search_results_are_projected_and_truncated():
+    compact = ToolResultCompactor(description_chars=20).compact("search_products", SEARCH)
+
+    assert compact.splitlines() == [
+        "Found 2 products matching 'jacket':",
+        "Mens Cotton Jacket | $55.99 | men's clothing | 4.7★ (500) | great outerwear jack…",
+        "Lock and Love Women's Removable Hooded Faux Leather Moto Biker Jacket | $29.95 | women's clothing"
+        " | 2.9★ (340) | 100% POLYURETHANE(sh…",
+    ]
+
+
+def test_search_results_are_capped_at_max_items():
+    compact = ToolResultCompactor(max_items=1).compact("search_products", SEARCH)
+
+    assert "Mens Cotton Jacket" in compact
+    assert "Moto Biker Jacket" not in compact
+    assert compact.endswith("(+1 more not shown - refine the search to see them)")
+
+
+def test_cart_keeps_unparsed_items_and_totals():
+    compact = ToolResultCompactor().compact("get_cart", GET_CART_UNKNOWN)
+
+    assert compact.splitlines() == [
+        "🛒 Your Cart (ID: 11)",
+        "2x | Mens Casual Premium Slim Fit T-Shirts | $22.3 | subtotal $44.60",
+        "1x Unknown Product (ID: 99)",
+        "Total: 3 items, $44.60",
+    ]
+
+
+def test_categories_are_joined_on_one_line():
+    compact = ToolResultCompactor().compact("get_categories", CATEGORIES)
+
+    assert compact == "Categories: electronics, jewelery, men's clothing, women's clothing"
+
+
+def test_unrecognised_text_is_unchanged():
+    text = "No products found matching 'unicorn'"
+
+    assert ToolResultCompactor().compact("search_products", text) == text
+    assert ToolResultCompactor().compact("add_to_cart", SEARCH) == SEARCH
+
+
+def test_max_chars_caps_any_result():
+    compact = ToolResultCompactor(max_chars=30).compact("add_to_cart", SEARCH)
+
+    assert compact == SEARCH[:30] + "…"
+
+
+def test_intercept_keeps_full_text_in_artifact():
+    async def call_next(call: ToolCall):
+        return SEARCH, ["mcp-artifact"]
+
+    content, artifact = asyncio.run(
+        ToolResultCompactor().intercept(ToolCall("search_products", {"query": "jacket"}), call_next)
+    )
+
+    assert content.startswith("Found 2 products matching 'jacket':\nMens Cotton Jacket | $55.99")
+    assert artifact == {"full_text": SEARCH, "artifact": ["mcp-artifact"]}
+
+
+def test_intercept_passes_through_uncompacted_results():
+    result = text_result("✅ Added 1x Mens Cotton Jacket ($55.99 each) to your cart.")
+
+    async def call_next(call: ToolCall):
+        return result
+
+    assert asyncio.run(ToolResultCompactor().intercept(ToolCall("add_to_cart", {}), call_next)) is result
+
+
+def test_expand_tool_results_restores_full_text():
+    compacted = ToolMessage(content="compact", tool_call_id="1", artifact={"full_text": SEARCH, "artifact": None})
+    plain = ToolMessage(content="as is", tool_call_id="2")
+    messages = [HumanMessage(content="jackets?"), AIMessage(content=""), compacted, plain]
+
+    expanded = expand_tool_results(messages)
+
+    assert [message.content for message in expanded] == ["jackets?", "", SEARCH, "as is"]
+    assert compacted.content == "compact"